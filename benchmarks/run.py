@@ -0,0 +1,126 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts")))
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from backtest import walk_forward, write_predictions
+from prediction import WalkForwardFeatures, load_completed_games, predict_games
+from ratings import SRSState, compute_rest_days_for_training, compute_srs
+from ridge import fit_ridge
+from snapshot import games_frame, load_games
+from synthetic import generate_league, write_db
+
+BACKTEST_KWARGS = dict(min_history=30, std_multiplier=1.0, ci_low=5, ci_high=95, decay_days=30)
+
+
+def best_of(repeat, func):
+    """Run func repeat times; return (fastest wall time in seconds, last result)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_size(n_teams, n_seasons, games_per_team, repeat, workdir):
+    """Time every stage on one synthetic league. Returns a list of result dicts."""
+    league = generate_league(n_teams=n_teams, n_seasons=n_seasons, games_per_team=games_per_team)
+    conn = write_db(league, os.path.join(workdir, f"league_{n_teams}x{n_seasons}", "games.db"))
+    timings = {}
+
+    timings["load_sql"], _ = best_of(repeat, lambda: games_frame(load_games(conn, use_cache=False)))
+    load_games(conn)  # build the snapshot so the next stage measures a warm start
+    timings["load_snapshot"], games = best_of(repeat, lambda: load_completed_games(conn))
+
+    last_year = games["date"].dt.year.max()
+    season = games[games["date"].dt.year == last_year]
+    timings["srs"], _ = best_of(repeat, lambda: compute_srs(season))
+    timings["rest_days"], _ = best_of(repeat, lambda: compute_rest_days_for_training(games))
+
+    features = WalkForwardFeatures(games)
+    last_date = games["date"].max()
+    n_prior = features.count_before(last_date)
+    srs_state = SRSState()
+    srs_state.add_games(features.games.iloc[features.count_before(pd.Timestamp(year=last_year, month=1, day=1)):n_prior])
+    srs = srs_state.ratings_array()
+    timings["fit"], (model, residual_std) = best_of(
+        repeat, lambda: fit_ridge(*features.training_set(n_prior, srs)))
+
+    day_games = features.games.iloc[n_prior:]
+    matchups = list(zip(day_games["home_team"], day_games["away_team"]))
+    timings["predict"], _ = best_of(repeat, lambda: predict_games(
+        model, residual_std, features.team_index, matchups, str(last_date.date()), srs))
+
+    dates = sorted(games["date"].dt.date.unique())
+    timings["backtest_base"], outcomes = best_of(
+        repeat, lambda: list(walk_forward(games, dates, mode="base", **BACKTEST_KWARGS)))
+    timings["backtest_bias"], _ = best_of(
+        repeat, lambda: list(walk_forward(games, dates, mode="bias", **BACKTEST_KWARGS)))
+
+    rows = [row for _, _, results, _ in outcomes if results for row in results]
+
+    def write():
+        conn.execute("DELETE FROM predictions")
+        conn.commit()
+        return write_predictions(conn, rows)
+
+    timings["write"], _ = best_of(repeat, write)
+    conn.close()
+
+    return [
+        {"teams": n_teams, "seasons": n_seasons, "games": len(games), "predictions": len(rows),
+         "stage": stage, "seconds": seconds, "repeat": repeat}
+        for stage, seconds in timings.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the ratings, prediction and backtest stages on synthetic leagues.")
+    parser.add_argument("--teams", type=int, nargs="+", default=[12],
+                        help="League sizes to benchmark (default: 12)")
+    parser.add_argument("--seasons", type=int, nargs="+", default=[2, 5, 10],
+                        help="History lengths in seasons to benchmark (default: 2 5 10)")
+    parser.add_argument("--games-per-team", type=int, default=40,
+                        help="Games per team per season (default: 40)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per stage; the fastest is reported (default: 3)")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_teams in args.teams:
+            for n_seasons in args.seasons:
+                size = bench_size(n_teams, n_seasons, args.games_per_team, args.repeat, workdir)
+                for r in size:
+                    print(f"{r['teams']:>3} teams {r['seasons']:>3} seasons {r['games']:>6} games  "
+                          f"{r['stage']:<14} {r['seconds'] * 1000:10.2f} ms", file=sys.stderr)
+                results.extend(size)
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "games_per_team": args.games_per_team,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
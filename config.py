@@ -4,3 +4,4 @@ import os
 DATA_DIR = "data"
 DB_PATH = os.path.join(DATA_DIR, "games.db")
 TABLE_NAME = "games"
+HTTP_CACHE_PATH = os.path.join(DATA_DIR, "cache", "http.db")
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import platform
+from datetime import datetime, timezone
+
+import numpy as np
+from ridge import LinearModel
+from teams import TEAMS, team_ids
+
+
+def training_hash(dates, home_codes, away_codes, margin):
+    """SHA-256 of the training games: their dates, teams and home margins.
+
+    These determine the features, SRS and fit completely, so two prefixes
+    of the games table with the same hash train identical models.
+    """
+    digest = hashlib.sha256()
+    for values, dtype in ((dates, "datetime64[ns]"), (home_codes, np.int64),
+                          (away_codes, np.int64), (margin, np.int64)):
+        digest.update(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    return digest.hexdigest()
+
+
+def save_model(conn, model, residual_std, srs, features, season, last_game_date, n_games,
+               data_hash, data_version=None, solver="closed-form"):
+    """Store a fitted model in the models table and return its id.
+
+    Args:
+        conn:           sqlite3 connection from db.connect().
+        model:          Fitted model with coef_ and intercept_.
+        residual_std:   Model residual standard deviation.
+        srs:            SRS ratings array by team id used for the features.
+        features:       Feature names, in coef_ order.
+        season:         Season the SRS covers.
+        last_game_date: Date of the last training game (YYYY-MM-DD), or None.
+        n_games:        Number of training games.
+        data_hash:      training_hash() of the training games.
+        data_version:   db.data_version() when the games were read, for reference.
+        solver:         Ridge solver that produced the fit.
+    """
+    srs = np.asarray(srs, dtype=float)
+    rated = np.flatnonzero(srs)
+    metadata = {"python": platform.python_version(), "numpy": np.__version__}
+    with conn:
+        cursor = conn.execute("""
+            INSERT INTO models (created_at, season, last_game_date, n_games, data_hash, data_version,
+                                solver, features, coef, intercept, residual_std, srs, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            datetime.now(timezone.utc).isoformat(timespec="seconds"), int(season), last_game_date,
+            int(n_games), data_hash, data_version, solver, json.dumps(list(features)),
+            json.dumps(np.asarray(model.coef_, dtype=float).tolist()), float(model.intercept_),
+            float(residual_std), json.dumps({TEAMS.names[i]: float(srs[i]) for i in rated}),
+            json.dumps(metadata),
+        ))
+    return cursor.lastrowid
+
+
+def load_model(conn, season, data_hash, features, solver="closed-form"):
+    """The newest stored model trained on exactly these games, or None.
+
+    Returns:
+        (model_id, model, residual_std, srs), with model a ridge.LinearModel
+        and srs an array by team id, or None if no artifact matches (or its
+        features differ from features).
+    """
+    row = conn.execute("""
+        SELECT id, features, coef, intercept, residual_std, srs FROM models
+        WHERE season = ? AND data_hash = ? AND solver = ?
+        ORDER BY id DESC LIMIT 1
+    """, (int(season), data_hash, solver)).fetchone()
+    if row is None or json.loads(row[1]) != list(features):
+        return None
+    model_id, _, coef, intercept, residual_std, srs_json = row
+    ratings = json.loads(srs_json)
+    ids = team_ids(list(ratings))
+    srs = np.zeros(len(TEAMS))
+    srs[ids] = list(ratings.values())
+    return model_id, LinearModel(np.array(json.loads(coef)), intercept), residual_std, srs
@@ -3,271 +3,226 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import argparse
-import sqlite3
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from sklearn.linear_model import Ridge
-from sklearn.metrics import mean_squared_error
-from config import DB_PATH, TABLE_NAME
-from ratings import compute_srs, compute_rest_days_for_training, get_rest_days
-
-
-def setup_db(conn):
-    """Create predictions table if needed and add source column if absent."""
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS predictions (
-            date TEXT,
-            home_team TEXT,
-            away_team TEXT,
-            predicted_home_score INTEGER,
-            predicted_away_score INTEGER,
-            predicted_diff REAL,
-            win_probability REAL,
-            conf_low REAL,
-            conf_high REAL,
-            source TEXT,
-            UNIQUE(date, home_team, away_team)
-        )
-    """)
-    try:
-        conn.execute("ALTER TABLE predictions ADD COLUMN source TEXT")
-    except Exception:
-        pass  # column already exists
-    conn.commit()
-
-
-def train_model(prior_games, srs):
-    """Train Ridge on SRS + rest day features. srs is a dict of team -> rating."""
-    training = compute_rest_days_for_training(prior_games)
-    X = pd.DataFrame({
-        "home_srs": training["home_team"].map(lambda t: srs.get(t, 0.0)),
-        "away_srs": training["away_team"].map(lambda t: srs.get(t, 0.0)),
-        "home_rest_days": training["home_rest_days"],
-        "away_rest_days": training["away_rest_days"],
-    })
-    y = training["home_score"] - training["away_score"]
-    model = Ridge()
-    model.fit(X, y)
-    y_pred = model.predict(X)
-    residual_std = max(np.sqrt(mean_squared_error(y, y_pred)), 1.0)
-    return model, residual_std
-
-
-def get_recent_form(games_df, team, n=5):
-    mask = (games_df["home_team"] == team) | (games_df["away_team"] == team)
-    return games_df[mask].sort_values("date", ascending=False).head(n)
-
-
-def predict_game(model, residual_std, prior_games, home, away, predict_date,
-                 home_srs, away_srs, home_rest, away_rest, std_multiplier, ci_low, ci_high):
-    recent_home = get_recent_form(prior_games, home)
-    recent_away = get_recent_form(prior_games, away)
-
-    if recent_home.empty:
-        return None, f"no prior form for {home}"
-    if recent_away.empty:
-        return None, f"no prior form for {away}"
-
-    features = pd.DataFrame(
-        [[home_srs, away_srs, home_rest, away_rest]],
-        columns=["home_srs", "away_srs", "home_rest_days", "away_rest_days"]
-    )
-    diff = model.predict(features)[0]
-
-    home_off = recent_home["home_score"].mean()
-    home_def = recent_home["away_score"].mean()
-    away_off = recent_away["away_score"].mean()
-    away_def = recent_away["home_score"].mean()
-    expected_total = (home_off + away_def + away_off + home_def) / 2
-
-    predicted_home = round((expected_total + diff) / 2)
-    predicted_away = round((expected_total - diff) / 2)
-
-    samples = np.random.normal(diff, residual_std * std_multiplier, size=10000)
-    win_prob = (samples > 0).mean()
-    conf_low_val = np.percentile(samples, ci_low)
-    conf_high_val = np.percentile(samples, ci_high)
-
-    return (predict_date, home, away, predicted_home, predicted_away,
-            diff, win_prob, conf_low_val, conf_high_val), None
-
-
-def get_team_biases(conn, before_date, prediction_date, decay_days):
-    """Compute per-team prediction bias using only backtest predictions before before_date.
-
-    Uses prediction_date (not today) as the decay reference to avoid lookahead.
-    """
-    query = """
-        SELECT
-            p.date,
-            p.home_team,
-            p.away_team,
-            p.predicted_diff,
-            g.home_score,
-            g.away_score
-        FROM predictions p
-        JOIN games g USING (date, home_team, away_team)
-        WHERE p.date < ?
-          AND p.source = 'backtest'
-          AND g.home_score IS NOT NULL
-          AND g.away_score IS NOT NULL
+from bias import DecayedBiasAccumulator
+from db import connect
+from instrument import STATS, count, profiling, stage
+from ratings import SRSState, load_ratings, materialize_ratings
+from ridge import TeamFeatureRidge, fit_ridge
+from prediction import WalkForwardFeatures, load_completed_games, predict_games
+from teams import lookup, team_ids
+
+
+def walk_forward(all_games, dates, mode, min_history, std_multiplier, ci_low, ci_high,
+                 decay_days, solver="closed-form", sampling=False, ratings=None):
+    """Predict each backtest date from the games before it.
+
+    Yields (date, n_prior, results, skipped) per date in order; results is None
+    when the date has fewer than min_history prior games.
+
+    Bias mode is self-contained: once a date's games are predicted, the
+    uncorrected model's residuals on them go straight into a
+    DecayedBiasAccumulator that corrects every later date. That is the
+    correction a base run followed by a bias run used to learn from the
+    stored base predictions, without needing the base run or the database.
+
+    ratings is an optional load_ratings() result; SRS found there is used
+    as is, and anything missing is computed.
     """
-    df = pd.read_sql(query, conn, params=(before_date,))
-    if df.empty:
-        return {}
-
-    df["date"] = pd.to_datetime(df["date"])
-    df["days_ago"] = (prediction_date - df["date"]).dt.days
-    df["decay_weight"] = np.exp(-df["days_ago"] / decay_days)
-
-    home_resid = df.copy()
-    home_resid["team"] = home_resid["home_team"]
-    home_resid["residual"] = home_resid["predicted_diff"] - (home_resid["home_score"] - home_resid["away_score"])
-
-    away_resid = df.copy()
-    away_resid["team"] = away_resid["away_team"]
-    away_resid["residual"] = (-away_resid["predicted_diff"]) - (away_resid["away_score"] - away_resid["home_score"])
-
-    combined = pd.concat([
-        home_resid[["team", "residual", "decay_weight"]],
-        away_resid[["team", "residual", "decay_weight"]],
-    ])
-
-    grouped = combined.groupby("team")[["residual", "decay_weight"]]
-    return grouped.apply(lambda g: np.average(g["residual"], weights=g["decay_weight"])).to_dict()
-
+    with stage("features"):
+        features = WalkForwardFeatures(all_games)
+    team_index = features.team_index
+    srs_state = None
+    srs_season = None
+    season_start = 0
+    ridge = TeamFeatureRidge(features.n_teams)
 
-def predict_game_bias(model, residual_std, prior_games, home, away, predict_date,
-                      home_srs, away_srs, home_rest, away_rest, team_biases,
-                      std_multiplier, ci_low, ci_high):
-    recent_home = get_recent_form(prior_games, home)
-    recent_away = get_recent_form(prior_games, away)
+    biases = DecayedBiasAccumulator(decay_days) if mode == "bias" else None
 
-    if recent_home.empty:
-        return None, f"no prior form for {home}"
-    if recent_away.empty:
-        return None, f"no prior form for {away}"
-
-    features = pd.DataFrame(
-        [[home_srs, away_srs, home_rest, away_rest]],
-        columns=["home_srs", "away_srs", "home_rest_days", "away_rest_days"]
-    )
-    diff = model.predict(features)[0]
-
-    home_bias = team_biases.get(home, 0)
-    away_bias = team_biases.get(away, 0)
-    diff -= (home_bias - away_bias)
-
-    home_off = recent_home["home_score"].mean()
-    home_def = recent_home["away_score"].mean()
-    away_off = recent_away["away_score"].mean()
-    away_def = recent_away["home_score"].mean()
-    expected_total = (home_off + away_def + away_off + home_def) / 2
+    for date in dates:
+        ts = pd.Timestamp(date)
+        n_prior = features.count_before(ts)
 
-    predicted_home = round((expected_total + diff) / 2)
-    predicted_away = round((expected_total - diff) / 2)
+        if n_prior < min_history:
+            yield date, n_prior, None, []
+            continue
 
-    samples = np.random.normal(diff, residual_std * std_multiplier, size=10000)
-    win_prob = (samples > 0).mean()
-    conf_low_val = np.percentile(samples, ci_low)
-    conf_high_val = np.percentile(samples, ci_high)
+        day_games = features.games.iloc[n_prior:features.count_before(ts + pd.Timedelta(days=1))]
 
-    return (predict_date, home, away, predicted_home, predicted_away,
-            diff, win_prob, conf_low_val, conf_high_val), None
+        # Compute SRS on current-season prior games only (no cross-season bleed)
+        with stage("srs"):
+            if srs_season != ts.year:
+                srs_state, srs_season = SRSState(), ts.year
+                season_start = features.count_before(pd.Timestamp(year=ts.year, month=1, day=1))
+            srs = None
+            if ratings and n_prior > season_start:
+                as_of_date = str(features.dates[n_prior - 1].astype("datetime64[D]"))
+                srs = ratings.get((ts.year, as_of_date))
+            if srs is None:
+                srs_state.add_games(features.games.iloc[season_start + srs_state.n_games:n_prior])
+                srs = srs_state.ratings_array()
+        with stage("fit"):
+            if solver == "closed-form":
+                features.add_to(ridge, ridge.n, n_prior)
+                model, residual_std = ridge.fit(features.srs_values(srs))
+            else:
+                model, residual_std = fit_ridge(*features.training_set(n_prior, srs), solver=solver)
+
+        team_biases = None
+        if biases is not None:
+            with stage("bias"):
+                team_biases = biases.biases_as_of(ts)
+
+        with stage("predict"):
+            results, skipped = predict_games(
+                model, residual_std, team_index,
+                zip(day_games["home_team"], day_games["away_team"]), str(date), srs,
+                team_biases=team_biases, std_multiplier=std_multiplier,
+                ci_low=ci_low, ci_high=ci_high, sampling=sampling,
+            )
+        if biases is not None and results:
+            with stage("bias"):
+                margins = dict(zip(zip(day_games["home_team"], day_games["away_team"]),
+                                   day_games["home_score"] - day_games["away_score"]))
+                home = [row[1] for row in results]
+                away = [row[2] for row in results]
+                home_ids, away_ids = team_ids(home), team_ids(away)
+                raw_diffs = (np.array([row[5] for row in results])
+                             + (lookup(team_biases, home_ids) - lookup(team_biases, away_ids)))
+                actual = np.array([margins[game] for game in zip(home, away)])
+                biases.add([str(date)] * len(results), home, away, raw_diffs - actual)
+        yield date, n_prior, results, skipped
+
+
+def write_predictions(conn, rows, mode=None):
+    """Insert backtest prediction rows in one transaction, keeping any that already exist.
+
+    mode ("base" or "bias") is recorded with each row. Returns the number of rows written.
+    """
+    with stage("write"):
+        cursor = conn.executemany("""
+            INSERT OR IGNORE INTO predictions
+                (date, home_team, away_team, predicted_home_score, predicted_away_score,
+                 predicted_diff, win_probability, conf_low, conf_high, source, mode)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'backtest', ?)
+        """, [(*row, mode) for row in rows])
+        conn.commit()
+    count("rows_written", cursor.rowcount)
+    return cursor.rowcount
+
+
+def _walk_forward_shard(all_games, dates, kwargs):
+    """Process-pool entry point: run one shard of dates; return its output and timings."""
+    STATS.reset()
+    outcomes = list(walk_forward(all_games, dates, **kwargs))
+    return outcomes, STATS.summary()
+
+
+def walk_forward_parallel(all_games, dates, workers, **kwargs):
+    """Base-mode walk_forward with one season per task across a process pool.
+
+    Each date only depends on the games before it, so seasons are independent;
+    every worker rebuilds features from the games up to the end of its shard.
+    Yields the same tuples as walk_forward, in date order.
+    """
+    shards = {}
+    for date in dates:
+        shards.setdefault(date.year, []).append(date)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_walk_forward_shard,
+                        all_games[all_games["date"] <= pd.Timestamp(shard[-1])], shard, kwargs)
+            for shard in shards.values()
+        ]
+        for future in futures:
+            outcomes, summary = future.result()
+            STATS.merge(summary)
+            yield from outcomes
+
+
+def _after_warmup(outcomes, start_date):
+    """Pass through walk_forward outcomes from start_date on; earlier ones only count as warm-up."""
+    for outcome in outcomes:
+        date, _, results, _ = outcome
+        if not start_date or date >= start_date:
+            yield outcome
+        elif results is not None:
+            count("warmup_dates")
+            count("warmup_predictions", len(results))
 
 
 def run_backtest(conn, all_games, mode, min_history, start_date, end_date,
-                 std_multiplier, ci_low, ci_high, decay_days, dry_run):
-    dates = sorted(all_games["date"].dt.date.unique())
+                 std_multiplier, ci_low, ci_high, decay_days, dry_run, solver="closed-form",
+                 sampling=False, workers=1, batch_size=5000):
+    all_dates = sorted(all_games["date"].dt.date.unique())
+    dates = all_dates
 
     if start_date:
         dates = [d for d in dates if d >= start_date]
     if end_date:
         dates = [d for d in dates if d <= end_date]
 
+    if not dry_run:
+        with stage("ratings"):
+            materialize_ratings(conn)
+    with stage("ratings"):
+        ratings = load_ratings(conn)
+
+    kwargs = dict(mode=mode, min_history=min_history, std_multiplier=std_multiplier,
+                  ci_low=ci_low, ci_high=ci_high, decay_days=decay_days,
+                  solver=solver, sampling=sampling, ratings=ratings)
+    if workers > 1 and mode == "bias":
+        print("Bias mode carries its bias state from date to date; running with 1 worker.\n")
+        workers = 1
+    if workers > 1:
+        outcomes = walk_forward_parallel(all_games, dates, workers, **kwargs)
+    elif mode == "bias":
+        # The bias state has to see the model's errors on every earlier date,
+        # so walk from the first date and only report from start_date on.
+        history = [d for d in all_dates if not end_date or d <= end_date]
+        outcomes = _after_warmup(walk_forward(all_games, history, **kwargs), start_date)
+    else:
+        outcomes = walk_forward(all_games, dates, **kwargs)
+
     total_predicted = 0
     total_skipped_form = 0
     total_written = 0
-    total_ignored = 0
-
-    for date in dates:
-        ts = pd.Timestamp(date)
-        prior_games = all_games[all_games["date"] < ts].copy()
+    pending = []
 
-        if len(prior_games) < min_history:
-            print(f"[{date}] Skipping — only {len(prior_games)} prior games (min: {min_history})")
+    for date, n_prior, results, skipped in outcomes:
+        if results is None:
+            print(f"[{date}] Skipping — only {n_prior} prior games (min: {min_history})")
             continue
 
-        day_games = all_games[all_games["date"] == ts]
-
-        # Compute SRS on current-season prior games only (no cross-season bleed)
-        season_prior = prior_games[prior_games["date"].dt.year == ts.year]
-        srs = compute_srs(season_prior)
-        model, residual_std = train_model(prior_games, srs)
-
-        team_biases = {}
-        if mode == "bias":
-            team_biases = get_team_biases(conn, str(date), ts, decay_days)
-
-        results = []
-        skipped = []
-
-        for _, row in day_games.iterrows():
-            home, away = row["home_team"], row["away_team"]
-            home_srs = srs.get(home, 0.0)
-            away_srs = srs.get(away, 0.0)
-            home_rest = get_rest_days(prior_games, home, ts)
-            away_rest = get_rest_days(prior_games, away, ts)
-
-            if mode == "bias":
-                result, err = predict_game_bias(
-                    model, residual_std, prior_games, home, away, str(date),
-                    home_srs, away_srs, home_rest, away_rest, team_biases,
-                    std_multiplier, ci_low, ci_high
-                )
-            else:
-                result, err = predict_game(
-                    model, residual_std, prior_games, home, away, str(date),
-                    home_srs, away_srs, home_rest, away_rest, std_multiplier, ci_low, ci_high
-                )
-
-            if err:
-                skipped.append(f"{away} @ {home} ({err})")
-            else:
-                results.append(result)
-
         for s in skipped:
             print(f"[{date}] Skipped: {s}")
+        count("dates")
+        count("predictions", len(results))
 
-        written = 0
-        ignored = 0
-        if not dry_run and results:
-            for r in results:
-                cursor = conn.execute("""
-                    INSERT OR IGNORE INTO predictions
-                        (date, home_team, away_team, predicted_home_score, predicted_away_score,
-                         predicted_diff, win_probability, conf_low, conf_high, source)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'backtest')
-                """, r)
-                if cursor.rowcount == 1:
-                    written += 1
-                else:
-                    ignored += 1
-            conn.commit()
+        if not dry_run:
+            pending.extend(results)
+            if len(pending) >= batch_size:
+                total_written += write_predictions(conn, pending, mode)
+                pending = []
 
         total_predicted += len(results)
         total_skipped_form += len(skipped)
-        total_written += written
-        total_ignored += ignored
 
         print(f"[{date}] {len(results)} predicted, {len(skipped)} skipped"
-              + (f", {written} written, {ignored} already exist" if not dry_run else " (dry run)")
-              + f" — {len(prior_games)} prior games")
+              + (" (dry run)" if dry_run else "")
+              + f" — {n_prior} prior games")
+
+    if pending:
+        total_written += write_predictions(conn, pending, mode)
 
     print(f"\nDone. {total_predicted} predictions, {total_skipped_form} skipped (no form).")
     if not dry_run:
-        print(f"DB: {total_written} written, {total_ignored} already existed.")
+        print(f"DB: {total_written} written, {total_predicted - total_written} already existed.")
+    STATS.report()
 
 
 def main():
@@ -286,38 +241,45 @@ def main():
                         help="Confidence interval percentiles (default: 5 95)")
     parser.add_argument("--decay-days", type=int, default=30,
                         help="Bias decay half-life in days; only used with --mode bias (default: 30)")
+    parser.add_argument("--solver", choices=["closed-form", "sklearn"], default="closed-form",
+                        help="Ridge solver: incremental closed form or sklearn refit per date (default: closed-form)")
+    parser.add_argument("--sampling", action="store_true",
+                        help="Monte Carlo win probability and CI instead of the closed-form normal")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes, one season per task; base mode only (default: 1)")
     parser.add_argument("--dry-run", action="store_true",
                         help="Run prediction logic but do not write to the database")
+    parser.add_argument("--profile", type=str, default=None, metavar="PATH",
+                        help="Write a cProfile dump to PATH.pstats and stage timings to PATH.json")
     args = parser.parse_args()
 
     start_date = datetime.strptime(args.start_date, "%Y-%m-%d").date() if args.start_date else None
     end_date = datetime.strptime(args.end_date, "%Y-%m-%d").date() if args.end_date else None
 
-    conn = sqlite3.connect(DB_PATH)
-    setup_db(conn)
-
-    all_games = pd.read_sql(
-        f"SELECT DISTINCT date, home_team, away_team, home_score, away_score FROM {TABLE_NAME} "
-        f"WHERE home_score IS NOT NULL AND away_score IS NOT NULL",
-        conn
-    )
-    all_games["date"] = pd.to_datetime(all_games["date"])
-
-    print(f"Loaded {len(all_games)} games. Mode: {args.mode}. Dry run: {args.dry_run}\n")
-
-    run_backtest(
-        conn=conn,
-        all_games=all_games,
-        mode=args.mode,
-        min_history=args.min_history,
-        start_date=start_date,
-        end_date=end_date,
-        std_multiplier=args.std_multiplier,
-        ci_low=args.ci[0],
-        ci_high=args.ci[1],
-        decay_days=args.decay_days,
-        dry_run=args.dry_run,
-    )
+    STATS.reset()
+    conn = connect()
+
+    with profiling(args.profile):
+        all_games = load_completed_games(conn)
+
+        print(f"Loaded {len(all_games)} games. Mode: {args.mode}. Dry run: {args.dry_run}\n")
+
+        run_backtest(
+            conn=conn,
+            all_games=all_games,
+            mode=args.mode,
+            min_history=args.min_history,
+            start_date=start_date,
+            end_date=end_date,
+            std_multiplier=args.std_multiplier,
+            ci_low=args.ci[0],
+            ci_high=args.ci[1],
+            decay_days=args.decay_days,
+            dry_run=args.dry_run,
+            solver=args.solver,
+            sampling=args.sampling,
+            workers=args.workers,
+        )
 
     conn.close()
 
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from teams import TEAMS, team_ids
+
+
+def _day_numbers(dates):
+    return np.asarray(pd.to_datetime(dates).to_numpy().astype("datetime64[D]"), dtype=np.int64)
+
+
+class DecayedBiasAccumulator:
+    """Per-team exponentially decayed mean prediction residual, updated incrementally.
+
+    A game's weight is exp(-days_ago / decay_days). Rather than recomputing
+    every weight for each new reference date, the per-team weighted sums are
+    kept relative to the latest date seen and rescaled by a single factor when
+    that date moves forward. Each add() costs O(games added) and each query
+    O(teams), with no re-reading of earlier games.
+
+    Residuals are predicted minus actual home margin; a game counts for the
+    home team as is and for the away team negated.
+
+    Usage:
+        biases = DecayedBiasAccumulator(decay_days=30)
+        biases.add(dates, home_teams, away_teams, residuals)
+        team_biases = biases.biases_as_of("2024-07-01")
+    """
+
+    def __init__(self, decay_days=30):
+        self.decay_days = decay_days
+        self._day = None  # reference day the sums are decayed to
+        self._sums = np.zeros(0)
+        self._weights = np.zeros(0)
+
+    def _advance(self, day):
+        if self._day is not None and day > self._day:
+            scale = np.exp(-(day - self._day) / self.decay_days)
+            self._sums *= scale
+            self._weights *= scale
+        if self._day is None or day > self._day:
+            self._day = day
+
+    def _grow(self, n_teams):
+        added = n_teams - len(self._sums)
+        if added > 0:
+            self._sums = np.pad(self._sums, (0, added))
+            self._weights = np.pad(self._weights, (0, added))
+
+    def add(self, dates, home_teams, away_teams, residuals):
+        """Absorb the residuals of games played on dates."""
+        days = _day_numbers(dates)
+        if not len(days):
+            return
+        self._advance(int(days.max()))
+
+        ids = np.concatenate([team_ids(home_teams), team_ids(away_teams)])
+        residuals = np.asarray(residuals, dtype=float)
+        residuals = np.concatenate([residuals, -residuals])
+        weights = np.tile(np.exp(-(self._day - days) / self.decay_days), 2)
+        self._grow(len(TEAMS))
+        self._sums += np.bincount(ids, weights=residuals * weights, minlength=len(self._sums))
+        self._weights += np.bincount(ids, weights=weights, minlength=len(self._weights))
+
+    def biases_as_of(self, date):
+        """Decayed mean residual per team as of date, as an array indexed by team id.
+
+        Teams without games get 0.0. Every game added so far counts, so add
+        only games played before date.
+        """
+        self._advance(int(_day_numbers([date])[0]))
+        self._grow(len(TEAMS))
+        return np.divide(self._sums, self._weights, out=np.zeros_like(self._sums), where=self._weights > 0)
@@ -4,90 +4,38 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 sys.path.append(os.path.dirname(__file__))
 
 import argparse
-import sqlite3
-import requests
-import pandas as pd
 from datetime import datetime, timedelta
-from dateutil import parser as dateparser
-import pytz
 
-from config import DB_PATH, TABLE_NAME
-import predict as predict_base
-import predict_bias as predict_bias_mod
+# Only light modules are imported up front. The modelling stack (pandas,
+# SciPy, the predictors) is imported where it is first needed, so a run with
+# no new results and nothing to predict never loads it.
+from db import connect, ratings_current
+from espn import fetch_scoreboards
+from http_cache import ResponseCache
+from ingest import ingest_scoreboards
+from instrument import STATS, profiling, stage
 
-LOCAL_TZ = pytz.timezone("US/Central")
 
-
-def fetch_espn_results(date):
-    """Fetch completed game results from ESPN for a given date."""
-    date_str = date.strftime("%Y%m%d")
-    url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/wnba/scoreboard?dates={date_str}"
-    resp = requests.get(url)
-    if resp.status_code != 200:
-        print(f"  ESPN fetch failed for {date_str} (status {resp.status_code})")
-        return []
-
-    games = []
-    for event in resp.json().get("events", []):
-        competition = event.get("competitions", [])[0]
-        if not competition.get("status", {}).get("type", {}).get("completed"):
-            continue
-        competitors = competition["competitors"]
-        home = next(c for c in competitors if c["homeAway"] == "home")
-        away = next(c for c in competitors if c["homeAway"] == "away")
-        game_date = competition["date"][:10]
-        games.append({
-            "date": game_date,
-            "home_team": home["team"]["displayName"],
-            "away_team": away["team"]["displayName"],
-            "home_score": int(home["score"]),
-            "away_score": int(away["score"]),
-        })
-    return games
-
-
-def insert_results(conn, games):
-    """Insert completed results, updating score if a row already exists."""
-    inserted = updated = skipped = 0
-    for g in games:
-        row = conn.execute(
-            f"SELECT home_score, away_score FROM {TABLE_NAME} "
-            "WHERE date = ? AND home_team = ? AND away_team = ?",
-            (g["date"], g["home_team"], g["away_team"])
-        ).fetchone()
-
-        if row is None:
-            conn.execute(
-                f"INSERT INTO {TABLE_NAME} (date, home_team, away_team, home_score, away_score, source) "
-                "VALUES (?, ?, ?, ?, ?, 'espn')",
-                (g["date"], g["home_team"], g["away_team"], g["home_score"], g["away_score"])
-            )
-            inserted += 1
-        elif row[0] != g["home_score"] or row[1] != g["away_score"]:
-            conn.execute(
-                f"UPDATE {TABLE_NAME} SET home_score = ?, away_score = ? "
-                "WHERE date = ? AND home_team = ? AND away_team = ?",
-                (g["home_score"], g["away_score"], g["date"], g["home_team"], g["away_team"])
-            )
-            updated += 1
-        else:
-            skipped += 1
-    conn.commit()
-    return inserted, updated, skipped
-
-
-def fetch_recent_results(conn, lookback_days):
-    """Pull completed results for the last N days from ESPN."""
+def fetch_recent_results(conn, lookback_days, cache=None):
+    """Pull results and schedule changes for the last N days from ESPN (through cache if given)."""
     print(f"Fetching results for last {lookback_days} days...")
-    total_inserted = total_updated = 0
-    for i in range(lookback_days, 0, -1):
-        date = datetime.today() - timedelta(days=i)
-        games = fetch_espn_results(date)
-        if games:
-            inserted, updated, _ = insert_results(conn, games)
-            total_inserted += inserted
-            total_updated += updated
-    print(f"  Results: {total_inserted} new, {total_updated} updated.\n")
+    dates = [datetime.today() - timedelta(days=i) for i in range(lookback_days, 0, -1)]
+    with stage("fetch"):
+        payloads = [payload for _, payload in fetch_scoreboards(dates, cache=cache)]
+    with stage("ingest"):
+        scheduled, inserted, updated = ingest_scoreboards(conn, payloads)
+    print(f"  Results: {inserted} new, {updated} updated. Schedule: {scheduled} added or re-timed.\n")
+
+
+def update_ratings(conn):
+    """Materialize SRS for any game dates the new results added or invalidated."""
+    with stage("ratings"):
+        if ratings_current(conn):
+            written = 0
+        else:
+            from ratings import materialize_ratings
+            written = materialize_ratings(conn)
+    print(f"  Ratings: {written} date(s) materialized.\n")
 
 
 def find_unpredicted_dates(conn):
@@ -108,23 +56,29 @@ def find_unpredicted_dates(conn):
     return [row[0] for row in rows]
 
 
-def run_predictions(dates, mode, dry_run):
-    """Run predictions for each date."""
+def run_predictions(conn, dates, mode, dry_run):
+    """Run predictions for each date, sharing one data load and model fit."""
     if not dates:
         print("No unpredicted upcoming games found.")
         return
 
     print(f"Running {mode} predictions for {len(dates)} date(s)...")
+    session = None
+    team_biases = None
     for date_str in dates:
         print(f"  Predicting {date_str}...")
         if dry_run:
             print(f"    [dry run] Would predict {date_str}")
             continue
         try:
-            if mode == "bias":
-                predict_bias_mod.main(date_str)
-            else:
-                predict_base.main(date_str)
+            if session is None:
+                from prediction import PredictionSession
+                session = PredictionSession(conn)
+                if mode == "bias":
+                    from predict_bias import get_team_biases_with_decay
+                    with stage("bias"):
+                        team_biases = get_team_biases_with_decay(conn)
+            session.run(date_str, team_biases=team_biases)
         except Exception as e:
             print(f"    Error predicting {date_str}: {e}")
 
@@ -137,19 +91,28 @@ def main():
                         help="Prediction mode: base or bias-corrected (default: base)")
     parser.add_argument("--dry-run", action="store_true",
                         help="Show what would happen without writing predictions")
+    parser.add_argument("--offline", action="store_true",
+                        help="Replay ESPN responses from the HTTP cache instead of fetching")
+    parser.add_argument("--profile", type=str, default=None, metavar="PATH",
+                        help="Write a cProfile dump to PATH.pstats and stage timings to PATH.json")
     args = parser.parse_args()
 
-    conn = sqlite3.connect(DB_PATH)
+    STATS.reset()
+    conn = connect()
 
-    fetch_recent_results(conn, args.lookback)
+    with profiling(args.profile):
+        with ResponseCache(offline=args.offline) as cache:
+            fetch_recent_results(conn, args.lookback, cache=cache)
+        update_ratings(conn)
 
-    unpredicted = find_unpredicted_dates(conn)
-    if unpredicted:
-        print(f"Found {len(unpredicted)} unpredicted date(s): {unpredicted[0]} → {unpredicted[-1]}")
-    conn.close()
+        unpredicted = find_unpredicted_dates(conn)
+        if unpredicted:
+            print(f"Found {len(unpredicted)} unpredicted date(s): {unpredicted[0]} → {unpredicted[-1]}")
 
-    run_predictions(unpredicted, args.mode, args.dry_run)
+        run_predictions(conn, unpredicted, args.mode, args.dry_run)
+    conn.close()
 
+    STATS.report()
     print("\nDone.")
 
 
@@ -0,0 +1,320 @@
+import os
+import sqlite3
+from config import DB_PATH, TABLE_NAME
+from teams import canonical_name
+
+
+def _add_column(conn, table, column, decl):
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _create_tables(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            home_score INTEGER,
+            away_score INTEGER,
+            source TEXT,
+            UNIQUE(date, home_team, away_team)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            game_time TEXT,
+            game_time_local TEXT,
+            source TEXT,
+            UNIQUE(date, home_team, away_team)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            date TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            predicted_home_score INTEGER,
+            predicted_away_score INTEGER,
+            predicted_diff REAL,
+            win_probability REAL,
+            conf_low REAL,
+            conf_high REAL,
+            source TEXT,
+            UNIQUE(date, home_team, away_team)
+        )
+    """)
+    # Databases created by older versions of the scripts lack these columns.
+    _add_column(conn, TABLE_NAME, "source", "TEXT")
+    _add_column(conn, "predictions", "source", "TEXT")
+
+
+def _create_indexes(conn):
+    for name, table, columns in [
+        ("idx_games_date", TABLE_NAME, "date"),
+        ("idx_games_home_team", TABLE_NAME, "home_team, date"),
+        ("idx_games_away_team", TABLE_NAME, "away_team, date"),
+        ("idx_schedule_date", "schedule", "date"),
+        ("idx_predictions_source_date", "predictions", "source, date"),
+        ("idx_predictions_home_team", "predictions", "home_team, date"),
+        ("idx_predictions_away_team", "predictions", "away_team, date"),
+    ]:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def _track_data_versions(conn):
+    # A persistent counter per table, bumped by triggers on every change, so
+    # caches derived from a table can tell whether they are stale.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Start from a random value so a recreated database never reuses the
+    # versions of an old one.
+    conn.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, abs(random() >> 16))",
+                 (TABLE_NAME,))
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}"
+                          for column in ("date", "home_team", "away_team", "home_score", "away_score"))
+    for event, when in (("INSERT", ""), ("UPDATE", f"WHEN {changed}"), ("DELETE", "")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {TABLE_NAME}_version_{event.lower()}
+            AFTER {event} ON {TABLE_NAME} {when}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = '{TABLE_NAME}';
+            END
+        """)
+
+
+def _canonicalize_team_names(conn):
+    # Rename aliases (other sources' spellings, former franchise names) to the
+    # registry's canonical name. A renamed row that collides with one already
+    # stored under the canonical name is the same game twice; the existing row
+    # is kept and the alias row dropped.
+    for table in (TABLE_NAME, "schedule", "predictions"):
+        for column in ("home_team", "away_team"):
+            names = [row[0] for row in conn.execute(f"SELECT DISTINCT {column} FROM {table}")]
+            for name in names:
+                canonical = canonical_name(name) if name is not None else None
+                if canonical == name:
+                    continue
+                conn.execute(f"UPDATE OR IGNORE {table} SET {column} = ? WHERE {column} = ?", (canonical, name))
+                conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (name,))
+
+
+def _create_ratings(conn):
+    # SRS per team after each game date of a season (see ratings.materialize_ratings).
+    # A game change only invalidates its own season's ratings on or after its
+    # date; earlier ratings never saw it and stay valid.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ratings (
+            team TEXT NOT NULL,
+            season INTEGER NOT NULL,
+            as_of_date TEXT NOT NULL,
+            srs REAL NOT NULL,
+            games_played INTEGER NOT NULL,
+            PRIMARY KEY (season, as_of_date, team)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ratings_team ON ratings (team, as_of_date)")
+    invalidate = """
+        DELETE FROM ratings
+        WHERE season = CAST(substr({row}.date, 1, 4) AS INTEGER) AND as_of_date >= {row}.date;
+    """
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}"
+                          for column in ("date", "home_team", "away_team", "home_score", "away_score"))
+    for event, when, rows in (("INSERT", "", ["NEW"]),
+                              ("UPDATE", f"WHEN {changed}", ["OLD", "NEW"]),
+                              ("DELETE", "", ["OLD"])):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {TABLE_NAME}_ratings_{event.lower()}
+            AFTER {event} ON {TABLE_NAME} {when}
+            BEGIN
+                {"".join(invalidate.format(row=row) for row in rows)}
+            END
+        """)
+
+
+def _localize_espn_dates(conn):
+    # ESPN results used to be dated by their UTC tip-off day, the schedule by
+    # the US/Central one, so a late game landed on the next day. Where the
+    # schedule row shows that happened, move the result back to the local
+    # date; if the local date already holds the game, drop the misdated copy.
+    local_date = """
+        SELECT s.date FROM schedule s
+        WHERE s.home_team = {table}.home_team AND s.away_team = {table}.away_team
+          AND substr(s.game_time, 1, 10) = {table}.date AND s.date <> {table}.date
+    """.format(table=TABLE_NAME)
+    conn.execute(f"""
+        UPDATE OR IGNORE {TABLE_NAME} SET date = ({local_date})
+        WHERE source = 'espn' AND EXISTS ({local_date})
+    """)
+    conn.execute(f"DELETE FROM {TABLE_NAME} WHERE source = 'espn' AND EXISTS ({local_date})")
+
+
+def _create_models(conn):
+    # Fitted model artifacts (see artifacts.py). data_hash identifies the
+    # training games, so an artifact is reused only on identical data.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS models (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            season INTEGER NOT NULL,
+            last_game_date TEXT,
+            n_games INTEGER NOT NULL,
+            data_hash TEXT NOT NULL,
+            data_version INTEGER,
+            solver TEXT NOT NULL,
+            features TEXT NOT NULL,
+            coef TEXT NOT NULL,
+            intercept REAL NOT NULL,
+            residual_std REAL NOT NULL,
+            srs TEXT NOT NULL,
+            metadata TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_models_lookup ON models (season, data_hash, solver)")
+    # Which model made each live prediction
+    _add_column(conn, "predictions", "model_id", "INTEGER")
+
+
+def _create_metrics(conn):
+    # Accuracy metrics kept up to date by evaluation.update_metrics(). metrics
+    # holds running sums per segment (season, month, team, ...), so new results
+    # are added without rescanning old ones; evaluated_predictions is the
+    # prediction/result pair each sum was built from, so a replaced prediction
+    # or corrected score can be taken back out. metrics_summary turns the sums
+    # into the usual statistics.
+    _add_column(conn, "predictions", "mode", "TEXT")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS evaluated_predictions (
+            date TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            source TEXT,
+            mode TEXT,
+            predicted_home_score INTEGER,
+            predicted_away_score INTEGER,
+            predicted_diff REAL,
+            home_win_prob REAL,
+            home_score INTEGER,
+            away_score INTEGER,
+            PRIMARY KEY (date, home_team, away_team)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metrics (
+            segment TEXT NOT NULL,
+            value TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            error REAL NOT NULL,
+            abs_error REAL NOT NULL,
+            sq_error REAL NOT NULL,
+            home_error REAL NOT NULL,
+            away_error REAL NOT NULL,
+            correct INTEGER NOT NULL,
+            brier REAL NOT NULL,
+            log_loss REAL NOT NULL,
+            home_win_prob REAL NOT NULL,
+            home_wins INTEGER NOT NULL,
+            PRIMARY KEY (segment, value)
+        )
+    """)
+    conn.execute("""
+        CREATE VIEW IF NOT EXISTS metrics_summary AS
+        SELECT
+            segment,
+            value,
+            n AS games,
+            abs_error / n AS mae,
+            sq_error / n AS mse,  -- sqrt() is not in every SQLite build; evaluation.load_metrics adds rmse
+            error / n AS bias,
+            home_error / n AS home_score_bias,
+            away_error / n AS away_score_bias,
+            1.0 * correct / n AS accuracy,
+            brier / n AS brier,
+            log_loss / n AS log_loss,
+            home_win_prob / n AS mean_home_win_prob,
+            1.0 * home_wins / n AS home_win_rate
+        FROM metrics
+        WHERE n > 0
+    """)
+
+
+# Applied in order; PRAGMA user_version records how many have run. Only
+# append to this list, never edit or reorder an entry that has shipped.
+MIGRATIONS = [
+    _create_tables,
+    _create_indexes,
+    _track_data_versions,
+    _canonicalize_team_names,
+    _create_ratings,
+    _localize_espn_dates,
+    _create_models,
+    _create_metrics,
+]
+
+
+def migrate(conn):
+    """Apply any migrations the database has not seen yet. Returns the schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:  # each migration and its version bump commit together
+            conn.execute("BEGIN")
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return len(MIGRATIONS)
+
+
+def data_version(conn, name=TABLE_NAME):
+    """Change counter for a table; it only ever increases."""
+    row = conn.execute("SELECT version FROM data_versions WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def ratings_current(conn):
+    """True if every date with a completed game has materialized ratings.
+
+    A cheap check, using only SQL, of whether ratings.materialize_ratings()
+    has anything to do.
+    """
+    return conn.execute(f"""
+        SELECT 1 FROM {TABLE_NAME} g
+        WHERE g.home_score IS NOT NULL AND g.away_score IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM ratings r
+                          WHERE r.season = CAST(substr(g.date, 1, 4) AS INTEGER) AND r.as_of_date = g.date)
+        LIMIT 1
+    """).fetchone() is None
+
+
+def connect(path=DB_PATH, timeout=30.0):
+    """Open the games database, bringing its schema up to date.
+
+    The database runs in WAL mode so readers (the notebook, the evaluators)
+    never block the writer and vice versa. synchronous=NORMAL is safe under
+    WAL and avoids an fsync per commit, and busy_timeout makes a second
+    writer wait instead of failing with "database is locked".
+
+    Args:
+        path:    Database file; its directory is created if needed.
+        timeout: Seconds to wait on a locked database.
+
+    Returns:
+        sqlite3 connection.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+    migrate(conn)
+    return conn
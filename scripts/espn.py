@@ -0,0 +1,129 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytz
+import requests
+from dateutil import parser as dateparser
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SCOREBOARD_URL = "https://site.api.espn.com/apis/site/v2/sports/basketball/wnba/scoreboard"
+LOCAL_TZ = pytz.timezone("US/Central")  # games are dated by their local tip-off day
+
+
+def make_session(max_workers=8, retries=3, backoff=0.5):
+    """A keep-alive session that retries transient failures with backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=max_workers)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def is_final(date, payload, today=None):
+    """True if a date's scoreboard can no longer change.
+
+    That is once the day is over (with a day's margin for late games and
+    time zones) and every game on it is completed. A postponed or suspended
+    game keeps the date open.
+    """
+    today = today or datetime.today()
+    if date.date() >= (today - timedelta(days=1)).date():
+        return False
+    return all(event.get("competitions", [{}])[0].get("status", {}).get("type", {}).get("completed")
+               for event in (payload or {}).get("events", []))
+
+
+def fetch_scoreboard(date, session, base_url=SCOREBOARD_URL, fixture_dir=None, timeout=10, cache=None):
+    """Fetch the scoreboard JSON for one date, or None if it could not be fetched.
+
+    With fixture_dir set, reads <fixture_dir>/<YYYYMMDD>.json instead of the
+    network (a missing file reads as an empty scoreboard). With cache (an
+    http_cache.ResponseCache) set, final dates are served from disk and open
+    ones revalidated.
+    """
+    date_str = date.strftime("%Y%m%d")
+    if fixture_dir is not None:
+        path = os.path.join(fixture_dir, f"{date_str}.json")
+        if not os.path.exists(path):
+            return {"events": []}
+        with open(path) as f:
+            return json.load(f)
+
+    try:
+        if cache is None:
+            resp = session.get(base_url, params={"dates": date_str}, timeout=timeout)
+        else:
+            resp = cache.get(session, base_url, params={"dates": date_str}, timeout=timeout,
+                             immutable=lambda r: is_final(date, r.json()))
+    except requests.RequestException as e:
+        print(f"  ESPN fetch failed for {date_str} ({e})")
+        return None
+    if resp.status_code != 200:
+        reason = "not cached, offline" if cache is not None and cache.offline else f"status {resp.status_code}"
+        print(f"  ESPN fetch failed for {date_str} ({reason})")
+        return None
+    return resp.json()
+
+
+def fetch_scoreboards(dates, max_workers=8, base_url=SCOREBOARD_URL, fixture_dir=None, cache=None):
+    """Fetch scoreboards for many dates concurrently over one pooled session.
+
+    Returns a list of (date, payload) in the order of dates; payload is None
+    for dates that failed after retries.
+    """
+    dates = list(dates)
+    session = make_session(max_workers=max_workers)
+    with session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        payloads = pool.map(
+            lambda d: fetch_scoreboard(d, session, base_url=base_url, fixture_dir=fixture_dir, cache=cache),
+            dates,
+        )
+        return list(zip(dates, payloads))
+
+
+def _home_away(competition):
+    competitors = competition["competitors"]
+    home = next(c for c in competitors if c["homeAway"] == "home")
+    away = next(c for c in competitors if c["homeAway"] == "away")
+    return home, away
+
+
+def parse_scoreboard(payload):
+    """Every game in a scoreboard payload, parsed once.
+
+    Both lists use the US/Central date of tip-off, so a late game is filed
+    under the day it was played rather than the next UTC day.
+
+    Returns:
+        (schedule, results): schedule has a dict per game with date,
+        home_team, away_team, game_time (UTC ISO), game_time_local and
+        source; results has a game dict (date, teams, scores, source) per
+        completed game.
+    """
+    schedule, results = [], []
+    for event in (payload or {}).get("events", []):
+        competition = event.get("competitions", [])[0]
+        home, away = _home_away(competition)
+        game_time = dateparser.parse(competition["date"])
+        game_time_local = game_time.astimezone(LOCAL_TZ)
+        game = {
+            "date": str(game_time_local.date()),
+            "home_team": home["team"]["displayName"],
+            "away_team": away["team"]["displayName"],
+            "source": "espn",
+        }
+        schedule.append({**game, "game_time": game_time.isoformat(),
+                         "game_time_local": game_time_local.isoformat()})
+        if competition.get("status", {}).get("type", {}).get("completed"):
+            results.append({**game, "home_score": int(home["score"]), "away_score": int(away["score"])})
+    return schedule, results
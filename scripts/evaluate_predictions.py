@@ -1,60 +1,59 @@
-import sqlite3
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-import pandas as pd
-from config import DB_PATH
-
-def evaluate_predictions():
-    conn = sqlite3.connect(DB_PATH)
-
-    # Join predictions to actual games
-    query = """
-        SELECT
-            p.date,
-            p.home_team,
-            p.away_team,
-            p.predicted_home_score,
-            p.predicted_away_score,
-            p.predicted_diff,
-            p.win_probability,
-            g.home_score AS actual_home_score,
-            g.away_score AS actual_away_score,
-            (g.home_score - g.away_score) AS actual_diff
-        FROM predictions p
-        JOIN games g
-            ON p.date = g.date
-           AND p.home_team = g.home_team
-           AND p.away_team = g.away_team
-        WHERE g.home_score IS NOT NULL AND g.away_score IS NOT NULL
-    """
-
-    df = pd.read_sql(query, conn)
+import argparse
+from db import connect
+from evaluation import SEGMENTS, evaluate, load_metrics, prediction_errors, resolved_predictions, update_metrics
+
+def evaluate_predictions(by=("source", "mode", "season"), rebuild=False):
+    conn = connect()
+
+    df = resolved_predictions(conn)
     if df.empty:
         print("No predictions matched with completed games yet.")
+        conn.close()
         return
 
-    df["error"] = (df["predicted_diff"] - df["actual_diff"]).abs()
-    df["winner_correct"] = (
-        ((df["predicted_diff"] > 0) & (df["actual_diff"] > 0)) |
-        ((df["predicted_diff"] < 0) & (df["actual_diff"] < 0))
-    )
+    errors = prediction_errors(df)
+    df["actual_diff"] = errors["actual_diff"]
+    df["error"] = errors["abs_error"]
+    df["winner_correct"] = errors["correct"].astype(bool)
 
     print("\nRecent Predictions:")
     print(df[[
         "date", "away_team", "home_team",
         "predicted_home_score", "predicted_away_score",
-        "actual_home_score", "actual_away_score",
+        "home_score", "away_score",
         "predicted_diff", "actual_diff", "error", "winner_correct"
-    ]].sort_values("date", ascending=False).to_string(index=False))
+    ]].rename(columns={"home_score": "actual_home_score", "away_score": "actual_away_score"})
+      .sort_values("date", ascending=False).to_string(index=False))
 
+    overall = evaluate(df).set_index("segment").loc["all"]
     print("\nEvaluation Summary:")
     print(f"Total evaluated games: {len(df)}")
-    print(f"Mean Absolute Error (MAE): {df['error'].mean():.2f}")
+    print(f"Mean Absolute Error (MAE): {overall['mae']:.2f}")
     print(f"Median Absolute Error: {df['error'].median():.2f}")
-    print(f"Correct winner prediction: {df['winner_correct'].mean():.1%}")
+    print(f"Correct winner prediction: {overall['accuracy']:.1%}")
+    print(f"Brier score: {overall['brier']:.4f}")
+    print(f"Log-loss: {overall['log_loss']:.4f}")
+
+    # Keep the stored metrics table current and report from it
+    added, removed = update_metrics(conn, rebuild=rebuild)
+    print(f"\nMetrics table: {added} evaluation(s) added, {removed} superseded.")
+    for segment in by:
+        metrics = load_metrics(conn, segment)
+        print(f"\nBy {segment}:")
+        print(metrics[["value", "games", "mae", "rmse", "accuracy", "brier", "log_loss"]]
+              .to_string(index=False, float_format=lambda x: f"{x:.3f}"))
 
     conn.close()
 
 if __name__ == "__main__":
-    evaluate_predictions()
+    parser = argparse.ArgumentParser(description="Score predictions against completed games.")
+    parser.add_argument("--by", nargs="+", default=["source", "mode", "season"],
+                        choices=SEGMENTS,
+                        help="Segments to break the stored metrics down by (default: source mode season)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute the metrics table from scratch instead of updating it")
+    args = parser.parse_args()
+    evaluate_predictions(by=args.by, rebuild=args.rebuild)
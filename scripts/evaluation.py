@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+from config import TABLE_NAME
+
+# Segments every metric is grouped by. "team" counts each game for both teams;
+# "calibration" groups by predicted home win probability in tenths.
+SEGMENTS = ["all", "season", "month", "team", "source", "mode", "calibration"]
+
+SUM_COLUMNS = ["n", "error", "abs_error", "sq_error", "home_error", "away_error",
+               "correct", "brier", "log_loss", "home_win_prob", "home_wins"]
+
+FIELDS = ["date", "home_team", "away_team", "source", "mode", "predicted_home_score",
+          "predicted_away_score", "predicted_diff", "home_win_prob", "home_score", "away_score"]
+
+# Every prediction with a final score. Live predictions store the projected
+# winner's probability rather than the home team's, so flip those where the
+# away team was projected to win.
+RESOLVED_QUERY = f"""
+    SELECT
+        p.date,
+        p.home_team,
+        p.away_team,
+        COALESCE(p.source, 'live') AS source,
+        COALESCE(p.mode, 'unknown') AS mode,
+        p.predicted_home_score,
+        p.predicted_away_score,
+        p.predicted_diff,
+        CASE WHEN p.source IS NULL AND p.predicted_diff <= 0 THEN 1 - p.win_probability
+             ELSE p.win_probability END AS home_win_prob,
+        g.home_score,
+        g.away_score
+    FROM predictions p
+    JOIN {TABLE_NAME} g
+        ON g.date = p.date
+       AND g.home_team = p.home_team
+       AND g.away_team = p.away_team
+    WHERE g.home_score IS NOT NULL AND g.away_score IS NOT NULL
+      AND p.predicted_diff IS NOT NULL AND p.win_probability IS NOT NULL
+"""
+
+_EPS = 1e-15
+
+
+def resolved_predictions(conn):
+    """All predictions whose game has a final score, one row each (see RESOLVED_QUERY)."""
+    return pd.read_sql(RESOLVED_QUERY, conn)
+
+
+def prediction_errors(rows):
+    """Per-prediction error terms for resolved_predictions() rows, computed in one pass.
+
+    Returns:
+        DataFrame aligned with rows: actual_diff, error (predicted minus
+        actual differential), abs_error, sq_error, home_error, away_error,
+        correct (winner called right), brier and log_loss (of the home win
+        probability) and home_win (1 if the home team won).
+    """
+    actual = (rows["home_score"] - rows["away_score"]).to_numpy(dtype=float)
+    diff = rows["predicted_diff"].to_numpy(dtype=float)
+    prob = rows["home_win_prob"].to_numpy(dtype=float)
+    home_win = (actual > 0).astype(int)
+    clipped = np.clip(prob, _EPS, 1 - _EPS)
+    error = diff - actual
+    return pd.DataFrame({
+        "actual_diff": actual,
+        "error": error,
+        "abs_error": np.abs(error),
+        "sq_error": error ** 2,
+        "home_error": (rows["predicted_home_score"] - rows["home_score"]).to_numpy(dtype=float),
+        "away_error": (rows["predicted_away_score"] - rows["away_score"]).to_numpy(dtype=float),
+        "correct": ((diff > 0) == (actual > 0)).astype(int),
+        "brier": (prob - home_win) ** 2,
+        "log_loss": -(home_win * np.log(clipped) + (1 - home_win) * np.log(1 - clipped)),
+        "home_win": home_win,
+    }, index=rows.index)
+
+
+def _calibration_bins(prob):
+    lower = np.minimum(np.floor(np.asarray(prob, dtype=float) * 10), 9) / 10
+    return np.char.add(np.char.add(np.char.mod("%.1f", lower), "-"), np.char.mod("%.1f", lower + 0.1))
+
+
+def metric_sums(rows, sign=1):
+    """Sums of every error term per (segment, value), for resolved_predictions() rows.
+
+    Sums rather than means, so results for new games can be added to (and,
+    with sign=-1, taken away from) stored totals.
+
+    Returns:
+        DataFrame with columns segment, value and SUM_COLUMNS.
+    """
+    if rows.empty:
+        return pd.DataFrame(columns=["segment", "value"] + SUM_COLUMNS)
+    errors = prediction_errors(rows)
+    values = pd.DataFrame({
+        "n": 1,
+        **{column: errors[column] for column in SUM_COLUMNS[1:-2]},
+        "home_win_prob": rows["home_win_prob"].astype(float),
+        "home_wins": errors["home_win"],
+    }) * sign
+
+    dates = pd.to_datetime(rows["date"])
+    keys = [
+        ("all", np.full(len(rows), "all")),
+        ("season", dates.dt.year.astype(str).to_numpy()),
+        ("month", dates.dt.strftime("%Y-%m").to_numpy()),
+        ("team", rows["home_team"].to_numpy()),
+        ("team", rows["away_team"].to_numpy()),
+        ("source", rows["source"].to_numpy()),
+        ("mode", rows["mode"].to_numpy()),
+        ("calibration", _calibration_bins(rows["home_win_prob"])),
+    ]
+    long = pd.concat([values.assign(segment=segment, value=key) for segment, key in keys], ignore_index=True)
+    return long.groupby(["segment", "value"], sort=True)[SUM_COLUMNS].sum().reset_index()
+
+
+def summarize(sums):
+    """Turn metric_sums() (or stored metrics) into MAE, RMSE, accuracy, Brier, log-loss etc."""
+    n = sums["n"]
+    return pd.DataFrame({
+        "segment": sums["segment"],
+        "value": sums["value"],
+        "games": n,
+        "mae": sums["abs_error"] / n,
+        "rmse": np.sqrt(sums["sq_error"] / n),
+        "bias": sums["error"] / n,
+        "home_score_bias": sums["home_error"] / n,
+        "away_score_bias": sums["away_error"] / n,
+        "accuracy": sums["correct"] / n,
+        "brier": sums["brier"] / n,
+        "log_loss": sums["log_loss"] / n,
+        "mean_home_win_prob": sums["home_win_prob"] / n,
+        "home_win_rate": sums["home_wins"] / n,
+    })
+
+
+def evaluate(rows):
+    """One-shot metrics for resolved_predictions() rows, per segment."""
+    return summarize(metric_sums(rows))
+
+
+def _as_params(frame, columns):
+    return list(zip(*(frame[column].tolist() for column in columns)))
+
+
+def update_metrics(conn, rebuild=False):
+    """Bring the metrics table up to date with the predictions and games tables.
+
+    Only predictions that are newly resolved, or whose prediction or score
+    has changed since they were last evaluated, are read and scored. Their
+    sums are added to the stored totals, and the superseded versions (and
+    any evaluated prediction that has since been deleted) are subtracted.
+
+    Args:
+        conn:    sqlite3 connection from db.connect().
+        rebuild: Discard the stored metrics and evaluate everything afresh.
+
+    Returns:
+        (added, removed): evaluated rows added to and taken out of the totals.
+    """
+    same_key = "e.date = c.date AND e.home_team = c.home_team AND e.away_team = c.away_team"
+    changed = " OR ".join(f"e.{field} IS NOT c.{field}" for field in FIELDS[3:])
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if rebuild:
+            conn.execute("DELETE FROM metrics")
+            conn.execute("DELETE FROM evaluated_predictions")
+        added = pd.read_sql(f"""
+            WITH c AS ({RESOLVED_QUERY})
+            SELECT c.* FROM c LEFT JOIN evaluated_predictions e ON {same_key}
+            WHERE e.date IS NULL OR {changed}
+        """, conn)
+        removed = pd.read_sql(f"""
+            WITH c AS ({RESOLVED_QUERY})
+            SELECT e.* FROM evaluated_predictions e LEFT JOIN c ON {same_key}
+            WHERE c.date IS NULL OR {changed}
+        """, conn)
+        if added.empty and removed.empty:
+            return 0, 0
+
+        delta = pd.concat([metric_sums(added), metric_sums(removed, sign=-1)])
+        delta = delta.groupby(["segment", "value"], sort=False)[SUM_COLUMNS].sum().reset_index()
+        columns = ["segment", "value"] + SUM_COLUMNS
+        conn.executemany(f"""
+            INSERT INTO metrics ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})
+            ON CONFLICT (segment, value) DO UPDATE SET
+                {", ".join(f"{column} = {column} + excluded.{column}" for column in SUM_COLUMNS)}
+        """, _as_params(delta, columns))
+        conn.execute("DELETE FROM metrics WHERE n = 0")
+
+        conn.executemany(
+            "DELETE FROM evaluated_predictions WHERE date = ? AND home_team = ? AND away_team = ?",
+            _as_params(removed, FIELDS[:3]),
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO evaluated_predictions ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+            _as_params(added, FIELDS),
+        )
+    return len(added), len(removed)
+
+
+def load_metrics(conn, segment=None):
+    """Stored metrics (the metrics_summary view, plus rmse), optionally for one segment."""
+    query, params = "SELECT * FROM metrics_summary", ()
+    if segment is not None:
+        query, params = query + " WHERE segment = ?", (segment,)
+    metrics = pd.read_sql(query + " ORDER BY segment, value", conn, params=params)
+    metrics.insert(metrics.columns.get_loc("mse"), "rmse", np.sqrt(metrics["mse"]))
+    return metrics.drop(columns="mse")
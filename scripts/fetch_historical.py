@@ -1,41 +1,16 @@
 import sys
 import os
+import argparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from config import DB_PATH, DATA_DIR
-import sqlite3
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 from time import sleep
+from db import connect
+from http_cache import ResponseCache
+from ingest import upsert_games
 from datetime import datetime
 
-# Ensure the data directory exists
-
-from config import DB_PATH, DATA_DIR
-os.makedirs(DATA_DIR, exist_ok=True)
-
-
-DB_PATH = os.path.join(DATA_DIR, "games.db")
-TABLE_NAME = "games"
-
-def create_table():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            home_team TEXT,
-            away_team TEXT,
-            home_score INTEGER,
-            away_score INTEGER,
-            source TEXT,
-            UNIQUE(date, home_team, away_team)
-        );
-    """)
-    conn.commit()
-    conn.close()
-
 def parse_game_row(row):
     try:
         date = row.find("th", {"data-stat": "date_game"}).text.strip()
@@ -66,13 +41,15 @@ def parse_game_row(row):
     except:
         return None
 
-def fetch_season_games(season):
+def fetch_season_games(season, session, cache):
+    """Fetch a season's results page through cache. Returns (games, from_cache)."""
     print(f"Fetching {season} season...")
     url = f"https://www.basketball-reference.com/wnba/years/{season}_games.html"
-    response = requests.get(url)
+    # A past season's page is final; the current one is revalidated
+    response = cache.get(session, url, immutable=lambda r: season < datetime.today().year)
     if response.status_code != 200:
         print(f"Failed to fetch {url}")
-        return []
+        return [], response.from_cache
 
     soup = BeautifulSoup(response.text, "html.parser")
     tables = soup.find_all("table")
@@ -86,32 +63,25 @@ def fetch_season_games(season):
             game = parse_game_row(row)
             if game:
                 games.append(game)
-    return games
+    return games, response.from_cache
 
 def insert_games(games):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    for game in games:
-        try:
-            c.execute(f"""
-                INSERT OR IGNORE INTO {TABLE_NAME} 
-                (date, home_team, away_team, home_score, away_score, source)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                game["date"], game["home_team"], game["away_team"],
-                game["home_score"], game["away_score"], game["source"]
-            ))
-        except Exception as e:
-            print(f"Error inserting game: {game} – {e}")
-    conn.commit()
+    conn = connect()
+    inserted, updated, unchanged = upsert_games(conn, games)
     conn.close()
+    print(f"{inserted} inserted, {updated} updated, {unchanged} unchanged.")
 
-def main(start_year=2018, end_year=2024):
-    create_table()
-    for season in range(start_year, end_year + 1):
-        games = fetch_season_games(season)
-        insert_games(games)
-        sleep(2)  # Be polite to the server
+def main(start_year=2018, end_year=2024, offline=False):
+    with requests.Session() as session, ResponseCache(offline=offline) as cache:
+        for season in range(start_year, end_year + 1):
+            games, from_cache = fetch_season_games(season, session, cache)
+            insert_games(games)
+            if not (from_cache or offline):
+                sleep(2)  # Be polite to the server
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Import historical results from basketball-reference.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Replay pages from the HTTP cache instead of fetching")
+    args = parser.parse_args()
+    main(offline=args.offline)
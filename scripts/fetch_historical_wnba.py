@@ -2,40 +2,24 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import sqlite3
+import argparse
 import pandas as pd
 from time import sleep
-from nba_api.stats.endpoints import LeagueGameFinder
-from config import DB_PATH, DATA_DIR, TABLE_NAME
-
-os.makedirs(DATA_DIR, exist_ok=True)
+from db import connect
+from ingest import upsert_games
 
 SOURCE = "stats_wnba"
 WNBA_LEAGUE_ID = "10"
 
 
-def create_table(conn):
-    conn.execute(f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            home_team TEXT,
-            away_team TEXT,
-            home_score INTEGER,
-            away_score INTEGER,
-            source TEXT,
-            UNIQUE(date, home_team, away_team)
-        )
-    """)
-    conn.commit()
-
-
 def fetch_season(season_year):
     """Fetch all completed games for a WNBA season.
 
     season_year is an int, e.g. 2018.
     Returns a DataFrame with columns: date, home_team, away_team, home_score, away_score.
     """
+    from nba_api.stats.endpoints import LeagueGameFinder  # deferred so --help works without nba_api
+
     print(f"Fetching {season_year} season...")
     finder = LeagueGameFinder(
         league_id_nullable=WNBA_LEAGUE_ID,
@@ -78,50 +62,37 @@ def fetch_season(season_year):
 
 
 def insert_games(conn, games_df):
-    inserted = 0
-    skipped = 0
-    for _, row in games_df.iterrows():
-        try:
-            cursor = conn.execute(f"""
-                INSERT OR IGNORE INTO {TABLE_NAME}
-                    (date, home_team, away_team, home_score, away_score, source)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                row["date"], row["home_team"], row["away_team"],
-                int(row["home_score"]), int(row["away_score"]),
-                SOURCE,
-            ))
-            if cursor.rowcount == 1:
-                inserted += 1
-            else:
-                skipped += 1
-        except Exception as e:
-            print(f"  Error inserting {row.to_dict()}: {e}")
-    conn.commit()
-    return inserted, skipped
+    return upsert_games(conn, games_df.to_dict("records"), source=SOURCE)
 
 
 def main(start_year=2018, end_year=2025):
-    conn = sqlite3.connect(DB_PATH)
-    create_table(conn)
+    conn = connect()
 
     total_inserted = 0
-    total_skipped = 0
+    total_updated = 0
+    total_unchanged = 0
 
     for year in range(start_year, end_year + 1):
         games = fetch_season(year)
         if games.empty:
             sleep(2)
             continue
-        inserted, skipped = insert_games(conn, games)
-        print(f"  {inserted} inserted, {skipped} skipped (already exist)")
+        inserted, updated, unchanged = insert_games(conn, games)
+        print(f"  {inserted} inserted, {updated} updated, {unchanged} unchanged")
         total_inserted += inserted
-        total_skipped += skipped
+        total_updated += updated
+        total_unchanged += unchanged
         sleep(2)  # be polite to the API
 
     conn.close()
-    print(f"\nDone. Total: {total_inserted} inserted, {total_skipped} skipped.")
+    print(f"\nDone. Total: {total_inserted} inserted, {total_updated} updated, {total_unchanged} unchanged.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Import completed games from stats.wnba.com via nba_api.")
+    parser.add_argument("--start-year", type=int, default=2018,
+                        help="First season to import (default: 2018)")
+    parser.add_argument("--end-year", type=int, default=2025,
+                        help="Last season to import (default: 2025)")
+    args = parser.parse_args()
+    main(start_year=args.start_year, end_year=args.end_year)
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import requests
+from config import HTTP_CACHE_PATH
+
+
+class CachedResponse(namedtuple("CachedResponse", ["url", "status_code", "content", "from_cache"])):
+    """The parts of a requests.Response the fetchers use.
+
+    from_cache is True when the body came from the cache, with or without a
+    304 revalidation.
+    """
+
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """On-disk cache of GET responses, keyed by full URL (including the query string).
+
+    Bodies are zlib-compressed in a SQLite file. An entry marked immutable
+    (say, the scoreboard of a finished day) is served without touching the
+    network. Any other entry is revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged resource costs a 304 with no body.
+    In offline mode nothing is fetched: cached entries are replayed and
+    misses come back as status 504.
+
+    Only 200 responses are stored. Safe to share between threads.
+
+    Usage:
+        cache = ResponseCache()
+        resp = cache.get(session, url, params={"dates": "20240701"},
+                         immutable=lambda resp: is_final(date, resp.json()))
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, offline=False):
+        self.offline = offline
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                immutable INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT body, etag, last_modified, immutable FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _store(self, url, body, etag, last_modified, immutable):
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses (url, body, etag, last_modified, immutable, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (url, zlib.compress(body), etag, last_modified, int(immutable), time.time()))
+
+    def _touch(self, url, immutable):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET immutable = ?, fetched_at = ? WHERE url = ?",
+                               (int(immutable), time.time(), url))
+
+    def get(self, session, url, params=None, immutable=None, timeout=10):
+        """GET url through the cache.
+
+        Args:
+            session:   requests.Session used on a miss or revalidation.
+            url:       Base URL.
+            params:    Optional query parameters.
+            immutable: Optional callable(CachedResponse) -> bool, asked after
+                       every network response; True pins the entry so it is
+                       never fetched again.
+            timeout:   Request timeout in seconds.
+
+        Returns:
+            CachedResponse. Network errors raise requests.RequestException as
+            session.get would.
+        """
+        url = requests.Request("GET", url, params=params).prepare().url
+        cached = self._lookup(url)
+        if cached is not None and (cached[3] or self.offline):
+            return CachedResponse(url, 200, zlib.decompress(cached[0]), True)
+        if self.offline:
+            return CachedResponse(url, 504, b"", False)
+
+        headers = {}
+        if cached is not None:
+            if cached[1]:
+                headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                headers["If-Modified-Since"] = cached[2]
+        resp = session.get(url, headers=headers, timeout=timeout)
+
+        if resp.status_code == 304 and cached is not None:
+            result = CachedResponse(url, 200, zlib.decompress(cached[0]), True)
+            self._touch(url, immutable is not None and immutable(result))
+            return result
+        result = CachedResponse(url, resp.status_code, resp.content, False)
+        if resp.status_code == 200:
+            self._store(url, resp.content, resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+                        immutable is not None and immutable(result))
+        return result
@@ -0,0 +1,112 @@
+from config import TABLE_NAME
+from espn import parse_scoreboard
+from teams import canonical_name
+
+
+def upsert_games(conn, games, source=None):
+    """Insert new game results and update changed scores in one batch.
+
+    Rows are staged in a temp table with a single executemany, counted against
+    the games table with one join, and merged with one
+    INSERT ... ON CONFLICT DO UPDATE that only touches rows whose score
+    changed. Team names are stored under their canonical registry name. If a
+    batch has the same game twice, the last one wins. Commits.
+
+    Args:
+        conn:   sqlite3 connection.
+        games:  Iterable of dicts with date, home_team, away_team, home_score,
+                away_score and optionally source.
+        source: Source recorded for new rows that do not carry their own.
+
+    Returns:
+        (inserted, updated, unchanged) counts.
+    """
+    with conn:
+        return _merge_games(conn, games, source)
+
+
+def _merge_games(conn, games, source):
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS staged_games (
+            date TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            home_score INTEGER,
+            away_score INTEGER,
+            source TEXT
+        )
+    """)
+    conn.execute("DELETE FROM staged_games")
+    conn.executemany(
+        "INSERT INTO staged_games VALUES (?, ?, ?, ?, ?, ?)",
+        ((g["date"], canonical_name(g["home_team"]), canonical_name(g["away_team"]),
+          g["home_score"], g["away_score"], g.get("source", source)) for g in games),
+    )
+    latest = "s.rowid IN (SELECT MAX(rowid) FROM staged_games GROUP BY date, home_team, away_team)"
+
+    inserted, updated, unchanged = conn.execute(f"""
+        SELECT
+            COALESCE(SUM(g.date IS NULL), 0),
+            COALESCE(SUM(g.date IS NOT NULL AND (g.home_score IS NOT s.home_score
+                                                 OR g.away_score IS NOT s.away_score)), 0),
+            COALESCE(SUM(g.date IS NOT NULL AND g.home_score IS s.home_score
+                                            AND g.away_score IS s.away_score), 0)
+        FROM staged_games s
+        LEFT JOIN {TABLE_NAME} g
+            ON g.date = s.date AND g.home_team = s.home_team AND g.away_team = s.away_team
+        WHERE {latest}
+    """).fetchone()
+
+    conn.execute(f"""
+        INSERT INTO {TABLE_NAME} (date, home_team, away_team, home_score, away_score, source)
+        SELECT date, home_team, away_team, home_score, away_score, source
+        FROM staged_games s
+        WHERE {latest}
+        ON CONFLICT (date, home_team, away_team) DO UPDATE SET
+            home_score = excluded.home_score,
+            away_score = excluded.away_score
+        WHERE {TABLE_NAME}.home_score IS NOT excluded.home_score
+           OR {TABLE_NAME}.away_score IS NOT excluded.away_score
+    """)
+    conn.execute("DELETE FROM staged_games")
+    return inserted, updated, unchanged
+
+
+def _merge_schedule(conn, games):
+    cursor = conn.executemany("""
+        INSERT INTO schedule (date, home_team, away_team, game_time, game_time_local, source)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (date, home_team, away_team) DO UPDATE SET
+            game_time = excluded.game_time,
+            game_time_local = excluded.game_time_local
+        WHERE schedule.game_time IS NOT excluded.game_time
+    """, [(g["date"], canonical_name(g["home_team"]), canonical_name(g["away_team"]),
+           g["game_time"], g["game_time_local"], g["source"]) for g in games])
+    return cursor.rowcount
+
+
+def ingest_scoreboards(conn, payloads):
+    """Write ESPN scoreboard payloads to the schedule and games tables together.
+
+    Each payload is parsed once (espn.parse_scoreboard): every game goes to
+    schedule, with its tip-off time updated if it moved, and completed games
+    go to games as upsert_games() would write them. Both tables commit in
+    one transaction. Payloads that are None (failed fetches) are skipped.
+
+    Args:
+        conn:     sqlite3 connection.
+        payloads: Iterable of scoreboard JSON payloads.
+
+    Returns:
+        (scheduled, inserted, updated): schedule rows added or re-timed, and
+        game results inserted or updated.
+    """
+    schedule, results = [], []
+    for payload in payloads:
+        day_schedule, day_results = parse_scoreboard(payload)
+        schedule.extend(day_schedule)
+        results.extend(day_results)
+    with conn:
+        scheduled = _merge_schedule(conn, schedule)
+        inserted, updated, _ = _merge_games(conn, results, "espn")
+    return scheduled, inserted, updated
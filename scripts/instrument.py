@@ -0,0 +1,124 @@
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+
+class _Timer:
+    __slots__ = ("timers", "name", "start")
+
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        timer = self.timers.get(self.name)
+        if timer is None:
+            timer = self.timers[self.name] = [0.0, 0]
+        timer[0] += time.perf_counter() - self.start
+        timer[1] += 1
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+class Instrumentation:
+    """Per-stage wall-clock timers and named counters for one run.
+
+    Stages can nest; each is timed on its own, so a parent's time includes
+    its children's. With enabled=False, stage() hands back a shared no-op
+    context manager and count() returns at once.
+
+    Usage:
+        with STATS.stage("fit"):
+            model = fit(...)
+        STATS.count("predictions", len(rows))
+        STATS.report()
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.timers = {}
+        self.counters = {}
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self.timers, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        """Stage times and counters as a JSON-ready dict."""
+        return {
+            "stages": {name: {"seconds": seconds, "calls": calls}
+                       for name, (seconds, calls) in self.timers.items()},
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, summary):
+        """Add in a summary() taken elsewhere, e.g. in a worker process."""
+        for name, stage in summary["stages"].items():
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += stage["seconds"]
+            timer[1] += stage["calls"]
+        for name, n in summary["counters"].items():
+            self.count(name, n)
+
+    def report(self, file=None):
+        """Print stage times (slowest first) and counters."""
+        file = file or sys.stdout
+        if not self.timers and not self.counters:
+            return
+        print("\nTiming:", file=file)
+        for name, (seconds, calls) in sorted(self.timers.items(), key=lambda item: -item[1][0]):
+            print(f"  {name:<18} {seconds:9.3f}s  {calls:>7} call{'s' if calls != 1 else ''}", file=file)
+        if self.counters:
+            print("  " + ", ".join(f"{name}={n}" for name, n in self.counters.items()), file=file)
+
+
+STATS = Instrumentation()
+stage = STATS.stage
+count = STATS.count
+
+
+@contextmanager
+def profiling(path=None):
+    """Run the block under cProfile when path is set.
+
+    Writes <path>.pstats (load with pstats.Stats) and <path>.json, the STATS
+    summary of per-stage wall time and call counts. Without a path this does
+    nothing.
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{path}.pstats")
+        with open(f"{path}.json", "w") as f:
+            json.dump(STATS.summary(), f, indent=2)
+        print(f"Profile written to {path}.pstats and {path}.json")
@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+from db import connect
+from ratings import materialize_ratings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store SRS ratings after every game date in the ratings table.")
+    parser.add_argument("--season", type=int, nargs="+", default=None,
+                        help="Only these seasons (default: all)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Delete the stored ratings for the selected seasons and recompute them")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.rebuild:
+        with conn:
+            if args.season:
+                conn.executemany("DELETE FROM ratings WHERE season = ?", [(season,) for season in args.season])
+            else:
+                conn.execute("DELETE FROM ratings")
+
+    written = materialize_ratings(conn, seasons=args.season)
+    stored = conn.execute("SELECT COUNT(DISTINCT season || as_of_date) FROM ratings").fetchone()[0]
+    conn.close()
+
+    print(f"Materialized {written} rating date(s); {stored} stored in total.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from artifacts import load_model, save_model, training_hash
+from db import data_version
+from ratings import SRSState, TeamGameIndex, compute_rest_days_for_training, load_ratings, save_ratings
+from instrument import count, stage
+from ridge import fit_ridge
+from snapshot import games_frame, load_games
+from teams import TEAMS, lookup, team_ids
+
+
+def outcome_distribution(diffs, residual_std, std_multiplier=1.0, ci_low=5, ci_high=95,
+                         sampling=False, n_samples=10000, sampler=None):
+    """Win probability and confidence interval for predicted score differentials.
+
+    The model's error is normal with sd residual_std * std_multiplier, so by
+    default both come straight from the normal CDF and its inverse for every
+    game at once. sampling=True draws n_samples per game instead, which is
+    slower and noisy but works for any error model.
+
+    Args:
+        diffs:          Predicted home-minus-away differentials (scalar or array).
+        residual_std:   Model residual standard deviation.
+        std_multiplier: Scales the error distribution (CI width).
+        ci_low:         Lower CI percentile (0-100).
+        ci_high:        Upper CI percentile (0-100).
+        sampling:       Use Monte Carlo sampling instead of the closed form.
+        n_samples:      Draws per game when sampling.
+        sampler:        Optional callable(size) returning unit-scale error draws
+                        for sampling; defaults to np.random.standard_normal.
+
+    Returns:
+        (win_prob, conf_low, conf_high) arrays, one entry per diff. win_prob is
+        the probability that the home team wins.
+    """
+    diffs = np.atleast_1d(np.asarray(diffs, dtype=float))
+    scale = residual_std * std_multiplier
+
+    if not sampling:
+        win_prob = ndtr(diffs / scale)
+        conf_low = diffs + scale * ndtri(ci_low / 100)
+        conf_high = diffs + scale * ndtri(ci_high / 100)
+        return win_prob, conf_low, conf_high
+
+    if sampler is None:
+        sampler = np.random.standard_normal
+    samples = diffs[:, None] + scale * sampler((len(diffs), n_samples))
+    win_prob = (samples > 0).mean(axis=1)
+    conf_low = np.percentile(samples, ci_low, axis=1)
+    conf_high = np.percentile(samples, ci_high, axis=1)
+    return win_prob, conf_low, conf_high
+
+
+FEATURE_COLUMNS = ["home_srs", "away_srs", "home_rest_days", "away_rest_days"]
+
+
+def predict_games(model, residual_std, team_index, matchups, predict_date, srs, team_biases=None,
+                  std_multiplier=1.0, ci_low=5, ci_high=95, sampling=False, form_games=5):
+    """Predict every game on one date with a single model.predict call.
+
+    Args:
+        model:        Fitted model with predict(X) over FEATURE_COLUMNS.
+        residual_std: Model residual standard deviation.
+        team_index:   TeamGameIndex of completed games, for rest days and recent form.
+        matchups:     Iterable of (home_team, away_team).
+        predict_date: Date string (YYYY-MM-DD); only games before it are used.
+        srs:          SRS ratings as an array indexed by team id.
+        team_biases:  Optional array of biases indexed by team id; the home/away
+                      difference is subtracted from each predicted differential.
+        form_games:   Number of recent games used for the expected total.
+
+    Returns:
+        (rows, skipped): rows are (date, home, away, predicted_home, predicted_away,
+        predicted_diff, win_probability, conf_low, conf_high) tuples, where
+        win_probability is the home team's; skipped lists "away @ home (reason)".
+    """
+    predict_ts = pd.Timestamp(predict_date)
+    games, rest, form, skipped = [], [], [], []
+    for home, away in matchups:
+        recent_home = team_index.recent_games(home, predict_ts, n=form_games)
+        recent_away = team_index.recent_games(away, predict_ts, n=form_games)
+        if not len(recent_home):
+            skipped.append(f"{away} @ {home} (no prior form for {home})")
+            continue
+        if not len(recent_away):
+            skipped.append(f"{away} @ {home} (no prior form for {away})")
+            continue
+
+        games.append((home, away))
+        rest.append((team_index.rest_days(home, predict_ts), team_index.rest_days(away, predict_ts)))
+        # Matchup-based scoring average
+        form.append((recent_home.home_score.mean(), recent_home.away_score.mean(),
+                     recent_away.away_score.mean(), recent_away.home_score.mean()))
+
+    if not games:
+        return [], skipped
+
+    home_ids, away_ids = team_ids([home for home, _ in games]), team_ids([away for _, away in games])
+    home_rest, away_rest = np.array(rest).T
+    features = pd.DataFrame({
+        "home_srs": lookup(srs, home_ids),
+        "away_srs": lookup(srs, away_ids),
+        "home_rest_days": home_rest,
+        "away_rest_days": away_rest,
+    }, columns=FEATURE_COLUMNS)
+    diffs = model.predict(features)
+    if team_biases is not None and len(team_biases):
+        diffs = diffs - (lookup(team_biases, home_ids) - lookup(team_biases, away_ids))
+
+    home_off, home_def, away_off, away_def = np.array(form).T
+    expected_total = (home_off + away_def + away_off + home_def) / 2
+    predicted_home = np.rint((expected_total + diffs) / 2).astype(int)
+    predicted_away = np.rint((expected_total - diffs) / 2).astype(int)
+
+    with stage("win_probability"):
+        win_probs, conf_lows, conf_highs = outcome_distribution(
+            diffs, residual_std, std_multiplier, ci_low, ci_high, sampling=sampling
+        )
+    rows = [(predict_date, home, away, *values) for (home, away), values in zip(games, zip(
+        predicted_home.tolist(), predicted_away.tolist(), diffs.tolist(),
+        win_probs.tolist(), conf_lows.tolist(), conf_highs.tolist(),
+    ))]
+    return rows, skipped
+
+
+class WalkForwardFeatures:
+    """Training features for the whole game history, computed once.
+
+    Games are sorted by date and a game's rest days depend only on earlier
+    games, so the training set for any backtest date is a prefix of these
+    arrays. Only the SRS columns change from date to date.
+    """
+
+    def __init__(self, all_games):
+        self.games = compute_rest_days_for_training(all_games)
+        self.team_index = TeamGameIndex(self.games)
+        self.dates = self.games["date"].to_numpy(dtype="datetime64[ns]")
+
+        self.home_codes = team_ids(self.games["home_team"])
+        self.away_codes = team_ids(self.games["away_team"])
+        self.n_teams = len(TEAMS)
+        self.home_rest = self.games["home_rest_days"].to_numpy()
+        self.away_rest = self.games["away_rest_days"].to_numpy()
+        self.margin = (self.games["home_score"] - self.games["away_score"]).to_numpy()
+
+    def count_before(self, ts):
+        """Number of games played strictly before ts."""
+        return int(np.searchsorted(self.dates, np.datetime64(ts, "ns"), side="left"))
+
+    def srs_values(self, srs):
+        """Ratings array (by team id) trimmed or zero-padded to this history's n_teams."""
+        return lookup(srs, np.arange(self.n_teams))
+
+    def add_to(self, ridge, start, stop):
+        """Feed games [start, stop) into a TeamFeatureRidge."""
+        ridge.add_games(self.home_codes[start:stop], self.away_codes[start:stop],
+                        self.home_rest[start:stop], self.away_rest[start:stop],
+                        self.margin[start:stop])
+
+    def training_hash(self, n_prior):
+        """artifacts.training_hash() of the first n_prior games."""
+        return training_hash(self.dates[:n_prior], self.home_codes[:n_prior],
+                             self.away_codes[:n_prior], self.margin[:n_prior])
+
+    def training_set(self, n_prior, srs):
+        """(X, y) for the first n_prior games, with SRS looked up from an array by team id."""
+        srs_values = self.srs_values(srs)
+        X = pd.DataFrame({
+            "home_srs": srs_values[self.home_codes[:n_prior]],
+            "away_srs": srs_values[self.away_codes[:n_prior]],
+            "home_rest_days": self.home_rest[:n_prior],
+            "away_rest_days": self.away_rest[:n_prior],
+        })
+        return X, self.margin[:n_prior]
+
+
+def load_completed_games(conn):
+    """All completed games, with date parsed to datetime (from the games snapshot)."""
+    with stage("load"):
+        return games_frame(load_games(conn))
+
+
+class PredictionSession:
+    """Predict any number of dates against a single load of the games table.
+
+    Features are built once. The fitted model and SRS for a date depend only
+    on the games before it, so they are cached on (season, last game date)
+    and every upcoming date after the latest result shares one fit. SRS is
+    read from the ratings table when it has been materialized there, and
+    saved to it when it had to be computed.
+
+    Fits are also kept across runs in the models table (artifacts.py), keyed
+    on a hash of the training games: a later run on the same data loads the
+    stored model instead of retraining. retrain=True always fits afresh
+    (and stores the result).
+
+    Usage:
+        session = PredictionSession(conn)
+        for date in dates:
+            session.run(date)
+    """
+
+    def __init__(self, conn, solver="closed-form", retrain=False):
+        self.conn = conn
+        self.solver = solver
+        self.retrain = retrain
+        self._version = data_version(conn)  # read first, so saved ratings are never newer than games
+        games = load_completed_games(conn)
+        with stage("features"):
+            self.features = WalkForwardFeatures(games)
+        self._fits = {}
+
+    def fit(self, predict_date):
+        """Return (model, residual_std, srs) trained on games before predict_date."""
+        return self._fit(predict_date)[:3]
+
+    def _fit(self, predict_date):
+        """(model, residual_std, srs, model_id) for predict_date, loading or storing an artifact."""
+        predict_ts = pd.Timestamp(predict_date)
+        season = predict_ts.year
+        n_prior = self.features.count_before(predict_ts)
+        last_date = self.features.dates[n_prior - 1] if n_prior else None
+        key = (season, last_date)
+        if key in self._fits:
+            return self._fits[key]
+
+        data_hash = self.features.training_hash(n_prior)
+        stored = None if self.retrain else load_model(self.conn, season, data_hash, FEATURE_COLUMNS, self.solver)
+        if stored is not None:
+            model_id, model, residual_std, srs = stored
+            count("models_loaded")
+        else:
+            season_start = self.features.count_before(pd.Timestamp(year=season, month=1, day=1))
+            with stage("srs"):
+                srs = self._season_ratings(season, season_start, n_prior)
+            with stage("fit"):
+                model, residual_std = fit_ridge(*self.features.training_set(n_prior, srs), solver=self.solver)
+            model_id = save_model(
+                self.conn, model, residual_std, srs, FEATURE_COLUMNS, season,
+                None if last_date is None else str(last_date.astype("datetime64[D]")),
+                n_prior, data_hash, data_version=self._version, solver=self.solver,
+            )
+            count("models_trained")
+        self._fits[key] = (model, residual_std, srs, model_id)
+        return self._fits[key]
+
+    def _season_ratings(self, season, season_start, n_prior):
+        """SRS from the season's games among the first n_prior, by team id."""
+        srs_state = SRSState()
+        if n_prior == season_start:
+            return srs_state.ratings_array()
+        as_of_date = str(self.features.dates[n_prior - 1].astype("datetime64[D]"))
+        stored = load_ratings(self.conn, season, as_of_date)
+        if stored:
+            return stored[(season, as_of_date)]
+        srs_state.add_games(self.features.games.iloc[season_start:n_prior])
+        save_ratings(self.conn, srs_state.rating_rows(season, as_of_date), self._version)
+        return srs_state.ratings_array()
+
+    def predict(self, predict_date, team_biases=None, std_multiplier=1.0, ci_low=5, ci_high=95,
+                sampling=False):
+        """Predict the scheduled games on predict_date. Returns predict_games rows."""
+        schedule = pd.read_sql("SELECT home_team, away_team FROM schedule WHERE date = ?",
+                               self.conn, params=(predict_date,))
+        model, residual_std, srs = self.fit(predict_date)
+        with stage("predict"):
+            rows, _ = predict_games(
+                model, residual_std, self.features.team_index,
+                zip(schedule["home_team"], schedule["away_team"]), predict_date, srs,
+                team_biases=team_biases, std_multiplier=std_multiplier,
+                ci_low=ci_low, ci_high=ci_high, sampling=sampling,
+            )
+        count("dates")
+        count("predictions", len(rows))
+        return rows
+
+    def run(self, predict_date, team_biases=None, std_multiplier=1.0, ci_low=5, ci_high=95,
+            sampling=False):
+        """Predict predict_date, print each game and save to the predictions table.
+
+        Each saved row records the id of the model (in the models table) that
+        made it, and its mode: "bias" when team_biases were applied, else "base".
+        """
+        model_id = self._fit(predict_date)[3]
+        mode = "base" if team_biases is None else "bias"
+        results = []
+        for _, home, away, predicted_home, predicted_away, diff, win_prob, conf_low, conf_high in self.predict(
+                predict_date, team_biases, std_multiplier, ci_low, ci_high, sampling):
+            winner = home if diff > 0 else away
+            winner_prob = win_prob if diff > 0 else 1 - win_prob
+            margin = abs(predicted_home - predicted_away)
+
+            print(f"{away} @ {home} on {predict_date}")
+            print(f"Prediction: {away} {predicted_away} - {predicted_home} {home}")
+            print(f"Projected winner: {winner} (margin = {margin:.2f})")
+            print(f"Win probability: {winner_prob*100:.1f}%")
+            print(f"{100 - ci_high}%–{ci_high}% CI for score diff: {conf_low:.1f} to {conf_high:.1f}\n")
+
+            results.append((predict_date, home, away, predicted_home, predicted_away, diff, winner_prob, conf_low, conf_high, model_id, mode))
+
+        with stage("write"):
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO predictions (date, home_team, away_team, predicted_home_score, predicted_away_score, predicted_diff, win_probability, conf_low, conf_high, model_id, mode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                results,
+            )
+            self.conn.commit()
+        return results
@@ -1,8 +1,13 @@
+from collections import namedtuple
+
 import numpy as np
 import pandas as pd
+from db import data_version
+from snapshot import games_frame, load_games
+from teams import TEAMS, team_ids
 
 
-def compute_srs(games_df, min_games=5, n_iter=100):
+def compute_srs(games_df, min_games=5, n_iter=100, method="vectorized", tol=1e-9):
     """Compute Simple Rating System (SRS) ratings for each team.
 
     SRS is an opponent-adjusted point differential rating. A team rated +5
@@ -12,11 +17,269 @@ def compute_srs(games_df, min_games=5, n_iter=100):
         games_df: DataFrame with columns home_team, away_team, home_score, away_score.
                   Should contain only completed games (no nulls in scores).
         min_games: Teams with fewer appearances get rating 0.0 (league average).
-        n_iter:   Number of iterations for convergence (100 is sufficient).
+        n_iter:   Maximum number of iterations for convergence (100 is sufficient).
+        method:   "vectorized" solves on a team/opponent count matrix and stops
+                  once ratings move less than tol; "iterative" is the original
+                  dict-based loop, kept as a reference implementation.
+        tol:      Convergence tolerance for the vectorized solver.
 
     Returns:
         dict mapping team name -> SRS rating (float). League average = 0.0.
+        The vectorized method keys teams by their canonical registry name.
     """
+    if method == "iterative":
+        return _compute_srs_iterative(games_df, min_games=min_games, n_iter=n_iter)
+    if method != "vectorized":
+        raise ValueError(f"Unknown SRS method: {method}")
+    if games_df.empty:
+        return {}
+
+    home = team_ids(games_df["home_team"])
+    away = team_ids(games_df["away_team"])
+    margin = (games_df["home_score"].to_numpy(dtype=float)
+              - games_df["away_score"].to_numpy(dtype=float))
+
+    # Opponent-count matrix: opp_counts[i, j] = games played between i and j
+    n_teams = len(TEAMS)
+    opp_counts = np.zeros((n_teams, n_teams))
+    np.add.at(opp_counts, (home, away), 1)
+    np.add.at(opp_counts, (away, home), 1)
+    game_counts = opp_counts.sum(axis=1)
+
+    margin_sums = (np.bincount(home, weights=margin, minlength=n_teams)
+                   - np.bincount(away, weights=margin, minlength=n_teams))
+    ratings, _ = _solve_srs(margin_sums, game_counts, opp_counts, n_iter=n_iter, tol=tol)
+    ratings[game_counts < min_games] = 0.0
+    played = np.flatnonzero(game_counts)
+    return dict(zip([TEAMS.names[i] for i in played], ratings[played].tolist()))
+
+
+def _solve_srs(margin_sums, game_counts, opp_counts, n_iter=100, tol=1e-9, start=None):
+    """Fixed-point SRS solve: rating = avg_margin + avg(opponent ratings).
+
+    Mirrors the reference iteration exactly, but as a matrix product, and exits
+    early once the largest rating change drops below tol. start warm-starts the
+    iteration from earlier ratings. Returns (ratings, converged), where ratings
+    is a NumPy array centered on the teams that have played (before the
+    min_games threshold is applied); teams with no games are 0.0.
+    """
+    played = game_counts > 0
+    avg_margin = np.zeros_like(margin_sums)
+    avg_margin[played] = margin_sums[played] / game_counts[played]
+    opp_weights = np.zeros_like(opp_counts)
+    opp_weights[played] = opp_counts[played] / game_counts[played, None]
+
+    if start is None:
+        srs = np.zeros_like(avg_margin)
+    else:
+        srs = _align_warm_start(start, game_counts, opp_counts)
+    converged = False
+    for _ in range(n_iter):
+        new_srs = avg_margin + opp_weights @ srs
+        converged = np.max(np.abs(new_srs - srs), initial=0.0) < tol
+        srs = new_srs
+        if converged:
+            break
+
+    # Zero-center so league average = 0.0
+    if played.any():
+        srs = np.where(played, srs - srs[played].mean(), 0.0)
+    return srs, converged
+
+
+def _align_warm_start(start, game_counts, opp_counts):
+    """Shift a warm start so it converges to the same ratings as a cold start.
+
+    The iteration preserves each connected group of teams' games-weighted mean
+    rating, which is zero from a cold start. Early in a season the schedule can
+    be disconnected, so re-center every group rather than the league as a whole.
+    """
+    labels = np.arange(len(start))
+    linked = opp_counts > 0
+    while True:
+        neighbour_min = np.where(linked, labels[None, :], len(labels)).min(axis=1, initial=len(labels))
+        new_labels = np.minimum(labels, neighbour_min)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    weights = np.bincount(labels, weights=game_counts * start, minlength=len(start))
+    totals = np.bincount(labels, weights=game_counts, minlength=len(start))
+    offsets = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+    return start - offsets[labels]
+
+
+class SRSState:
+    """Running SRS inputs for one season, updated as games are appended.
+
+    Keeps per-team margin sums, game counts and the opponent-count matrix so
+    new games cost O(games added) to absorb, and warm-starts each solve from
+    the previous ratings once a solve has converged; until then (very early in
+    a season) it solves from zero, exactly as compute_srs() does.
+
+    Usage:
+        state = SRSState()
+        state.add_games(games_so_far)
+        srs = state.ratings()
+    """
+
+    def __init__(self, min_games=5, n_iter=100, tol=1e-9):
+        self.min_games = min_games
+        self.n_iter = n_iter
+        self.tol = tol
+        self.n_games = 0
+        self._margin_sums = np.zeros(0)
+        self._game_counts = np.zeros(0)
+        self._opp_counts = np.zeros((0, 0))
+        self._last = np.zeros(0)
+        self._converged = False
+        self._cached = None
+
+    def _grow(self, n_teams):
+        added = n_teams - len(self._margin_sums)
+        if added <= 0:
+            return
+        self._margin_sums = np.pad(self._margin_sums, (0, added))
+        self._game_counts = np.pad(self._game_counts, (0, added))
+        self._opp_counts = np.pad(self._opp_counts, ((0, added), (0, added)))
+        self._last = np.pad(self._last, (0, added))
+
+    def add_games(self, games_df):
+        """Absorb completed games (columns home_team, away_team, home_score, away_score)."""
+        if games_df.empty:
+            return
+        home = team_ids(games_df["home_team"])
+        away = team_ids(games_df["away_team"])
+        n_teams = len(TEAMS)
+        self._grow(n_teams)
+
+        margin = (games_df["home_score"].to_numpy(dtype=float)
+                  - games_df["away_score"].to_numpy(dtype=float))
+        self._margin_sums += (np.bincount(home, weights=margin, minlength=n_teams)
+                              - np.bincount(away, weights=margin, minlength=n_teams))
+        self._game_counts += np.bincount(home, minlength=n_teams) + np.bincount(away, minlength=n_teams)
+        np.add.at(self._opp_counts, (home, away), 1)
+        np.add.at(self._opp_counts, (away, home), 1)
+        self.n_games += len(games_df)
+        self._cached = None
+
+    def ratings_array(self):
+        """Return SRS ratings as an array indexed by team id (0.0 for teams without games)."""
+        self._grow(len(TEAMS))
+        if self._cached is None or len(self._cached) < len(TEAMS):
+            start = self._last if self._converged else None
+            self._last, self._converged = _solve_srs(
+                self._margin_sums, self._game_counts, self._opp_counts,
+                n_iter=self.n_iter, tol=self.tol, start=start,
+            )
+            ratings = self._last.copy()
+            ratings[self._game_counts < self.min_games] = 0.0
+            self._cached = ratings
+        return self._cached.copy()
+
+    def ratings(self):
+        """Return dict mapping team name -> SRS rating, as compute_srs would."""
+        ratings = self.ratings_array()
+        played = np.flatnonzero(self._game_counts)
+        return dict(zip([TEAMS.names[i] for i in played], ratings[played].tolist()))
+
+    def rating_rows(self, season, as_of_date):
+        """Rows for the ratings table: (team, season, as_of_date, srs, games_played) per team with games."""
+        ratings = self.ratings_array()
+        played = np.flatnonzero(self._game_counts)
+        return [(TEAMS.names[i], season, as_of_date, float(ratings[i]), int(self._game_counts[i]))
+                for i in played]
+
+
+def load_ratings(conn, season=None, as_of_date=None):
+    """Materialized SRS from the ratings table, optionally for one season and/or date.
+
+    Returns:
+        dict mapping (season, as_of_date) -> array of ratings indexed by team id,
+        holding the SRS from that season's games on or before as_of_date.
+    """
+    clauses, params = [], []
+    if season is not None:
+        clauses.append("season = ?")
+        params.append(int(season))
+    if as_of_date is not None:
+        clauses.append("as_of_date = ?")
+        params.append(str(as_of_date))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(f"SELECT season, as_of_date, team, srs FROM ratings {where}", params).fetchall()
+    if not rows:
+        return {}
+    seasons, dates, teams, srs = zip(*rows)
+    ids = team_ids(teams)
+    ratings = {}
+    for key, team_id, value in zip(zip(seasons, dates), ids, srs):
+        if key not in ratings:
+            ratings[key] = np.zeros(len(TEAMS))
+        ratings[key][team_id] = value
+    return ratings
+
+
+def save_ratings(conn, rows, version):
+    """Store SRSState.rating_rows() output, unless the games table has moved past version.
+
+    version is db.data_version() read before the games behind the rows were
+    loaded; if games changed since, the rows may be stale and nothing is saved.
+
+    Returns:
+        True if the rows were saved.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if data_version(conn) != version:
+            return False
+        conn.executemany("""
+            INSERT OR REPLACE INTO ratings (team, season, as_of_date, srs, games_played)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+    return True
+
+
+def materialize_ratings(conn, seasons=None):
+    """Fill the ratings table with the SRS after every game date that lacks it.
+
+    Each season is walked forward with one SRSState, solving only at the dates
+    whose ratings are missing. Triggers on the games table delete a season's
+    ratings on and after any changed game's date, so a re-run recomputes just
+    those and leaves the rest alone.
+
+    Args:
+        conn:    sqlite3 connection from db.connect().
+        seasons: Optional iterable of seasons (years) to limit the work to.
+
+    Returns:
+        Number of (season, as_of_date) rating sets written.
+    """
+    version = data_version(conn)
+    games = games_frame(load_games(conn))
+    done = set(conn.execute("SELECT DISTINCT season, as_of_date FROM ratings").fetchall())
+    seasons = None if seasons is None else {int(season) for season in seasons}
+
+    rows, written = [], 0
+    for season, season_games in games.groupby(games["date"].dt.year, sort=True):
+        season = int(season)
+        if seasons is not None and season not in seasons:
+            continue
+        dates = season_games["date"].dt.strftime("%Y-%m-%d").to_numpy()
+        ends = np.append(np.flatnonzero(dates[1:] != dates[:-1]) + 1, len(dates))
+        missing = [end for end in ends if (season, dates[end - 1]) not in done]
+        state = SRSState()
+        for end in missing:
+            state.add_games(season_games.iloc[state.n_games:end])
+            rows.extend(state.rating_rows(season, dates[end - 1]))
+            written += 1
+
+    if rows and not save_ratings(conn, rows, version):
+        return 0
+    return written
+
+
+def _compute_srs_iterative(games_df, min_games=5, n_iter=100):
+    """Reference dict-based SRS solver; see compute_srs."""
     if games_df.empty:
         return {}
 
@@ -82,56 +345,115 @@ def compute_rest_days_for_training(games_df, default=7, max_days=14):
     Returns:
         A copy of games_df sorted by date with new columns added.
     """
-    games = games_df.sort_values("date").reset_index(drop=True).copy()
-    last_game = {}  # team -> (date, year)
-    home_rest_list = []
-    away_rest_list = []
+    games = games_df.sort_values("date", kind="stable").reset_index(drop=True)
+    n_games = len(games)
 
-    for _, row in games.iterrows():
-        home, away = row["home_team"], row["away_team"]
-        game_date = row["date"]
-        game_year = game_date.year
+    # One row per (team, game): home appearances first, then away, in game order
+    long = pd.DataFrame({
+        "row": np.tile(np.arange(n_games), 2),
+        "team": np.concatenate([team_ids(games["home_team"]), team_ids(games["away_team"])]),
+        "date": np.tile(games["date"].to_numpy(), 2),
+    })
+    long["season"] = long["date"].dt.year
+    long = long.sort_values("row", kind="stable")
 
-        if home in last_game and last_game[home][1] == game_year:
-            h_rest = min((game_date - last_game[home][0]).days, max_days)
-        else:
-            h_rest = default
+    rest = long.groupby(["team", "season"], sort=False)["date"].diff().dt.days
+    rest = rest.fillna(default).clip(upper=max_days).astype(int).sort_index().to_numpy()
 
-        if away in last_game and last_game[away][1] == game_year:
-            a_rest = min((game_date - last_game[away][0]).days, max_days)
-        else:
-            a_rest = default
+    games["home_rest_days"] = rest[:n_games]
+    games["away_rest_days"] = rest[n_games:]
+    return games
 
-        home_rest_list.append(h_rest)
-        away_rest_list.append(a_rest)
 
-        last_game[home] = (game_date, game_year)
-        last_game[away] = (game_date, game_year)
+class TeamGames(namedtuple("TeamGames", ["dates", "points_for", "points_against", "is_home"])):
+    """A slice of one team's games in date order, as parallel NumPy arrays."""
 
-    games["home_rest_days"] = home_rest_list
-    games["away_rest_days"] = away_rest_list
-    return games
+    __slots__ = ()
 
+    def __len__(self):
+        return len(self.dates)
 
-def get_rest_days(prior_games, team, game_date, default=7, max_days=14):
-    """Days since a team's last game in the current season, for live prediction.
+    @property
+    def home_score(self):
+        return np.where(self.is_home, self.points_for, self.points_against)
 
-    Args:
-        prior_games: DataFrame of completed games before game_date.
-        team:        Team name.
-        game_date:   The prediction date as a pd.Timestamp.
-        default:     Returned if the team has no prior games this season.
-        max_days:    Cap on returned value.
+    @property
+    def away_score(self):
+        return np.where(self.is_home, self.points_against, self.points_for)
 
-    Returns:
-        int: rest days, capped at max_days.
+
+class TeamGameIndex:
+    """Per-team game history, sorted by date, for "as of date" lookups.
+
+    Built once from a games table; each query is a binary search on the team's
+    date array instead of a mask over the whole table.
+
+    Args:
+        games_df: DataFrame with columns date, home_team, away_team, home_score,
+                  away_score. date must be a datetime column.
     """
-    season_year = game_date.year
-    team_games = prior_games[
-        ((prior_games["home_team"] == team) | (prior_games["away_team"] == team)) &
-        (prior_games["date"].dt.year == season_year)
-    ]
-    if team_games.empty:
-        return default
-    last_game_date = team_games["date"].max()
-    return min((game_date - last_game_date).days, max_days)
+
+    def __init__(self, games_df):
+        n_games = len(games_df)
+        home_scores = games_df["home_score"].to_numpy(dtype=float)
+        away_scores = games_df["away_score"].to_numpy(dtype=float)
+        long = pd.DataFrame({
+            "team": np.concatenate([team_ids(games_df["home_team"]), team_ids(games_df["away_team"])]),
+            "date": np.tile(games_df["date"].to_numpy(), 2),
+            "points_for": np.concatenate([home_scores, away_scores]),
+            "points_against": np.concatenate([away_scores, home_scores]),
+            "is_home": np.repeat([True, False], n_games),
+        }).sort_values(["team", "date"], kind="stable")
+
+        self._dates = long["date"].to_numpy(dtype="datetime64[ns]")
+        self._points_for = long["points_for"].to_numpy()
+        self._points_against = long["points_against"].to_numpy()
+        self._is_home = long["is_home"].to_numpy()
+
+        # Games for team id t are rows _starts[t]:_starts[t + 1]
+        counts = np.bincount(long["team"].to_numpy(), minlength=len(TEAMS))
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def _before(self, team, game_date):
+        """Return (start, stop) bounds of a team's games strictly before game_date."""
+        team_id = TEAMS.id(team)
+        if team_id + 1 >= len(self._starts):
+            return 0, 0
+        start, end = int(self._starts[team_id]), int(self._starts[team_id + 1])
+        cutoff = np.datetime64(pd.Timestamp(game_date), "ns")
+        return start, start + int(np.searchsorted(self._dates[start:end], cutoff, side="left"))
+
+    def _slice(self, start, stop):
+        return TeamGames(self._dates[start:stop], self._points_for[start:stop],
+                         self._points_against[start:stop], self._is_home[start:stop])
+
+    def last_game_before(self, team, game_date):
+        """Date of the team's most recent game before game_date, or None."""
+        start, stop = self._before(team, game_date)
+        if stop == start:
+            return None
+        return pd.Timestamp(self._dates[stop - 1])
+
+    def recent_games(self, team, game_date, n=5):
+        """The team's last n games before game_date, most recent first."""
+        start, stop = self._before(team, game_date)
+        start = max(start, stop - n)
+        games = self._slice(start, stop)
+        return TeamGames(*(column[::-1] for column in games))
+
+    def rest_days(self, team, game_date, default=7, max_days=14):
+        """Days since a team's last game in the current season, for live prediction.
+
+        Args:
+            team:      Team name or alias.
+            game_date: The prediction date as a pd.Timestamp.
+            default:   Returned if the team has no prior games this season.
+            max_days:  Cap on returned value.
+
+        Returns:
+            int: rest days, capped at max_days.
+        """
+        last_game_date = self.last_game_before(team, game_date)
+        if last_game_date is None or last_game_date.year != game_date.year:
+            return default
+        return min((game_date - last_game_date).days, max_days)
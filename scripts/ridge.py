@@ -0,0 +1,145 @@
+import numpy as np
+
+
+class LinearModel:
+    """Fitted linear model with the parts of sklearn's Ridge API the scripts use."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+
+def solve_ridge(gram, xty, yty, alpha=1.0):
+    """Solve ridge regression from accumulated sums.
+
+    Args:
+        gram:  (p+1, p+1) matrix A^T A, where A is X with a leading column of ones.
+        xty:   (p+1,) vector A^T y.
+        yty:   Scalar y^T y.
+        alpha: L2 penalty. The intercept is not penalized, matching sklearn's Ridge.
+
+    Returns:
+        (LinearModel, residual sum of squares)
+    """
+    penalty = np.full(len(xty), float(alpha))
+    penalty[0] = 0.0
+    beta = np.linalg.solve(gram + np.diag(penalty), xty)
+    rss = max(yty - 2 * beta @ xty + beta @ gram @ beta, 0.0)
+    return LinearModel(beta[1:], beta[0]), rss
+
+
+def _residual_std(rss, n):
+    return max(np.sqrt(rss / n), 1.0)  # Prevent collapse
+
+
+def fit_ridge(X, y, solver="closed-form", alpha=1.0):
+    """Fit Ridge on a prepared feature frame. Returns (model, residual_std).
+
+    solver="closed-form" solves the normal equations directly; "sklearn" uses
+    sklearn.linear_model.Ridge. Both give the same coefficients.
+    """
+    if solver == "closed-form":
+        ridge = IncrementalRidge(X.shape[1], alpha)
+        ridge.add(X, y)
+        return ridge.fit()
+    if solver != "sklearn":
+        raise ValueError(f"Unknown Ridge solver: {solver}")
+
+    from sklearn.linear_model import Ridge
+    from sklearn.metrics import mean_squared_error
+
+    model = Ridge(alpha=alpha)
+    model.fit(X, y)
+    residual_std = np.sqrt(mean_squared_error(y, model.predict(X)))
+    return model, max(residual_std, 1.0)
+
+
+class IncrementalRidge:
+    """Closed-form Ridge that keeps X^T X and X^T y as rows are added.
+
+    Each add() is a sum of rank-one updates to the accumulators, and fit() is
+    a single (p+1)x(p+1) solve, so refitting after a few new rows is cheap.
+    Coefficients match sklearn.linear_model.Ridge(alpha) with an intercept.
+    """
+
+    def __init__(self, n_features, alpha=1.0):
+        self.alpha = alpha
+        self.n = 0
+        self.gram = np.zeros((n_features + 1, n_features + 1))
+        self.xty = np.zeros(n_features + 1)
+        self.yty = 0.0
+
+    def add(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        A = np.column_stack([np.ones(len(X)), X])
+        self.gram += A.T @ A
+        self.xty += A.T @ y
+        self.yty += y @ y
+        self.n += len(y)
+
+    def fit(self):
+        """Return (model, residual_std) for the rows added so far."""
+        model, rss = solve_ridge(self.gram, self.xty, self.yty, self.alpha)
+        return model, _residual_std(rss, self.n)
+
+
+class TeamFeatureRidge:
+    """Incremental Ridge on [home_srs, away_srs, home_rest_days, away_rest_days].
+
+    In a walk-forward backtest every prior game's SRS features are re-looked-up
+    from the current ratings on each date, so a plain X^T X accumulator goes
+    stale. Instead this keeps per-team sums (games, home/away pairings, rest
+    days and margins by team) from which X^T X and X^T y are assembled for any
+    rating vector in O(teams^2).
+
+    Teams are integer codes in [0, n_teams); fit() takes ratings as an array
+    indexed the same way.
+    """
+
+    def __init__(self, n_teams, alpha=1.0):
+        self.alpha = alpha
+        self.rest = IncrementalRidge(2, alpha)  # intercept + rest-day columns
+        self.pairs = np.zeros((n_teams, n_teams))
+        # Rows: home games, away games. Columns: count, home rest, away rest, margin.
+        self.by_home = np.zeros((n_teams, 4))
+        self.by_away = np.zeros((n_teams, 4))
+
+    @property
+    def n(self):
+        return self.rest.n
+
+    def add_games(self, home_codes, away_codes, home_rest, away_rest, margin):
+        home_rest = np.asarray(home_rest, dtype=float)
+        away_rest = np.asarray(away_rest, dtype=float)
+        margin = np.asarray(margin, dtype=float)
+        self.rest.add(np.column_stack([home_rest, away_rest]), margin)
+        np.add.at(self.pairs, (home_codes, away_codes), 1)
+        values = np.column_stack([np.ones(len(margin)), home_rest, away_rest, margin])
+        np.add.at(self.by_home, home_codes, values)
+        np.add.at(self.by_away, away_codes, values)
+
+    def fit(self, srs_values):
+        """Return (model, residual_std) with SRS features taken from srs_values."""
+        s = np.asarray(srs_values, dtype=float)
+        home_stats = s @ self.by_home  # [sum home_srs, sum home_srs*home_rest, ...]
+        away_stats = s @ self.by_away
+        home_sq = (s * s) @ self.by_home[:, 0]
+        away_sq = (s * s) @ self.by_away[:, 0]
+        cross = s @ self.pairs @ s
+
+        gram = np.zeros((5, 5))
+        gram[np.ix_([0, 3, 4], [0, 3, 4])] = self.rest.gram
+        gram[0, 1:3] = home_stats[0], away_stats[0]
+        gram[1, 1:3] = home_sq, cross
+        gram[2, 2] = away_sq
+        gram[1, 3:5] = home_stats[1:3]
+        gram[2, 3:5] = away_stats[1:3]
+        gram = np.triu(gram) + np.triu(gram, 1).T
+
+        xty = np.array([self.rest.xty[0], home_stats[3], away_stats[3], self.rest.xty[1], self.rest.xty[2]])
+        model, rss = solve_ridge(gram, xty, self.rest.yty, self.alpha)
+        return model, _residual_std(rss, self.n)
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from config import TABLE_NAME
+from db import data_version
+from teams import TEAMS, team_ids
+
+GameArrays = namedtuple("GameArrays", ["day", "home", "away", "home_score", "away_score", "teams"])
+GameArrays.__doc__ = """Completed games as typed columns, sorted by date.
+
+day is int32 days since 1970-01-01; home and away are int16 team ids (see
+teams.TEAMS) and teams is the name for each id; scores are int16.
+"""
+
+_COLUMNS = ["day", "home", "away", "home_score", "away_score"]
+
+
+def _read_games(conn):
+    rows = conn.execute(f"""
+        SELECT DISTINCT date, home_team, away_team, home_score, away_score FROM {TABLE_NAME}
+        WHERE home_score IS NOT NULL AND away_score IS NOT NULL
+        ORDER BY date, home_team, away_team
+    """).fetchall()
+    dates, home, away, home_score, away_score = zip(*rows) if rows else ((),) * 5
+    home, away = team_ids(home), team_ids(away)
+    return GameArrays(
+        day=np.array(dates, dtype="datetime64[D]").astype(np.int32),
+        home=home.astype(np.int16),
+        away=away.astype(np.int16),
+        home_score=np.array(home_score, dtype=np.int16),
+        away_score=np.array(away_score, dtype=np.int16),
+        teams=np.array(TEAMS.names, dtype=str),
+    )
+
+
+def _cache_dir(conn):
+    """Directory for snapshots next to the database file, or None for in-memory databases."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main" and path:
+            return os.path.join(os.path.dirname(path), "cache")
+    return None
+
+
+def _write(arrays, directory, path):
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".games-", dir=directory)
+    for name, values in arrays._asdict().items():
+        np.save(os.path.join(staging, f"{name}.npy"), values)
+    try:
+        os.rename(staging, path)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)  # another process got there first
+    for entry in os.listdir(directory):
+        if entry.startswith("games-") and os.path.join(directory, entry) != path:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def load_games(conn, use_cache=True):
+    """Completed games as GameArrays, from the on-disk snapshot when it is current.
+
+    Snapshots live in <db dir>/cache/games-<version>/ as one .npy file per
+    column and are memory-mapped on load. The version is the games table's
+    change counter (db.data_version), so any insert, score update or delete
+    makes the next call rebuild the snapshot from SQLite.
+
+    Args:
+        conn:      sqlite3 connection from db.connect().
+        use_cache: Set False to always read from SQLite.
+
+    Returns:
+        GameArrays.
+    """
+    directory = _cache_dir(conn) if use_cache else None
+    if directory is None:
+        return _read_games(conn)
+
+    version = data_version(conn)
+    path = os.path.join(directory, f"games-{version}")
+    if os.path.isdir(path):
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _COLUMNS}
+        teams = np.load(os.path.join(path, "teams.npy"))
+        ids = team_ids(teams)
+        if not np.array_equal(ids, np.arange(len(teams))):
+            # Names outside FRANCHISES were registered in a different order by this process
+            columns["home"] = ids[columns["home"]].astype(np.int16)
+            columns["away"] = ids[columns["away"]].astype(np.int16)
+            teams = np.array(TEAMS.names, dtype=str)
+        return GameArrays(teams=teams, **columns)
+
+    arrays = _read_games(conn)
+    if data_version(conn) == version:  # skip caching if a writer got in between
+        _write(arrays, directory, path)
+    return arrays
+
+
+def games_frame(arrays):
+    """GameArrays as a DataFrame with the columns of the games table and a datetime date."""
+    teams = arrays.teams.astype(object)
+    return pd.DataFrame({
+        "date": np.asarray(arrays.day).astype("datetime64[D]").astype("datetime64[ns]"),
+        "home_team": teams[arrays.home],
+        "away_team": teams[arrays.away],
+        "home_score": np.asarray(arrays.home_score, dtype=np.int64),
+        "away_score": np.asarray(arrays.away_score, dtype=np.int64),
+    })
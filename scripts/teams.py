@@ -0,0 +1,90 @@
+import numpy as np
+
+# Every franchise with the names and abbreviations ESPN, stats.wnba.com and
+# basketball-reference have used for it. A franchise's id is its position in
+# this list, so only ever append: ids are stored in caches and arrays.
+FRANCHISES = [
+    ("Atlanta Dream", ["ATL"]),
+    ("Chicago Sky", ["CHI"]),
+    ("Connecticut Sun", ["CON", "CONN", "Orlando Miracle", "ORL"]),
+    ("Dallas Wings", ["DAL", "Tulsa Shock", "TUL", "Detroit Shock", "DET"]),
+    ("Indiana Fever", ["IND"]),
+    ("Las Vegas Aces", ["LV", "LVA", "San Antonio Stars", "San Antonio Silver Stars", "SA", "SAS",
+                        "Utah Starzz", "UTA"]),
+    ("Los Angeles Sparks", ["LA Sparks", "LA", "LAS"]),
+    ("Minnesota Lynx", ["MIN"]),
+    ("New York Liberty", ["NY", "NYL"]),
+    ("Phoenix Mercury", ["PHO", "PHX"]),
+    ("Seattle Storm", ["SEA"]),
+    ("Washington Mystics", ["WAS", "WSH"]),
+    ("Charlotte Sting", ["CHA"]),
+    ("Cleveland Rockers", ["CLE"]),
+    ("Houston Comets", ["HOU"]),
+    ("Miami Sol", ["MIA"]),
+    ("Sacramento Monarchs", ["SAC"]),
+    ("Golden State Valkyries", ["GS", "GSV"]),
+    ("Toronto Tempo", ["TOR"]),
+    ("Portland Fire", ["POR"]),
+]
+
+
+class TeamRegistry:
+    """Maps team names and aliases to small integer ids.
+
+    Known franchises get fixed ids from FRANCHISES. A name the registry has
+    never seen gets the next free id for the rest of the process, so arrays
+    indexed by id must be sized with len(registry) after the ids are taken.
+
+    Usage:
+        home_ids = TEAMS.ids(games["home_team"])
+        ratings = np.zeros(len(TEAMS))
+    """
+
+    def __init__(self, franchises=FRANCHISES):
+        self.names = []
+        self._ids = {}
+        for name, aliases in franchises:
+            self._add(name)
+            for alias in aliases:
+                self._ids[alias.casefold()] = self._ids[name.casefold()]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _add(self, name):
+        self._ids[name.casefold()] = len(self.names)
+        self.names.append(name)
+        return self._ids[name.casefold()]
+
+    def id(self, name):
+        """Id for a team name or alias, registering the name if it is new."""
+        key = str(name).strip().casefold()
+        team_id = self._ids.get(key)
+        return team_id if team_id is not None else self._add(str(name).strip())
+
+    def ids(self, names):
+        """Ids for an array of names, as an int array. Raises ValueError on a missing (None/NaN) name."""
+        import pandas as pd  # deferred: db and ingest import this module on paths that never need pandas
+
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        if (codes < 0).any():
+            raise ValueError(f"Missing team name at position {int(np.argmax(codes < 0))}")
+        return np.array([self.id(name) for name in uniques], dtype=np.intp)[codes]
+
+    def canonical(self, name):
+        """The franchise's current name for any of its names or aliases."""
+        return self.names[self.id(name)]
+
+
+TEAMS = TeamRegistry()
+team_ids = TEAMS.ids
+canonical_name = TEAMS.canonical
+
+
+def lookup(values, ids, default=0.0):
+    """values[ids] for an array indexed by team id, with default for ids past its end."""
+    ids = np.asarray(ids)
+    out = np.full(ids.shape, default, dtype=float)
+    known = ids < len(values)
+    out[known] = np.asarray(values)[ids[known]]
+    return out
@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import runpy
+
+# Each subcommand runs one of the scripts in this directory exactly as if it
+# had been called directly, so a command only imports what its script needs.
+COMMANDS = {
+    "update": ("daily_update", "Fetch recent results and predict upcoming games"),
+    "predict": ("predict", "Predict the games on one date (--mode bias for the bias-corrected model)"),
+    "backtest": ("backtest", "Backtest predictions against historical data"),
+    "evaluate": ("evaluate_predictions", "Score prediction accuracy"),
+    "ratings": ("materialize_ratings", "Store SRS ratings per game date"),
+    "fetch": (None, "Load data from ESPN, stats.wnba.com or basketball-reference"),
+}
+
+FETCH_SOURCES = {
+    "schedule": ("fetch_schedule", "Upcoming schedule from ESPN (next 90 days)"),
+    "results": ("backfill_espn", "Recent results from ESPN"),
+    "today": ("fetch_data", "Today's ESPN scoreboard"),
+    "history": ("fetch_historical_wnba", "Completed games since 2018 via nba_api"),
+    "bref": ("fetch_historical", "Completed games from basketball-reference"),
+}
+
+
+def run_script(module, args):
+    """Run scripts/<module>.py as __main__ with args as its command line."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module}.py")
+    sys.argv = [path] + list(args)
+    runpy.run_path(path, run_name="__main__")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="wnba",
+        description="WNBA predictor. Options after the command go to that command; "
+                    "use 'wnba.py <command> --help' for them.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (_, help_text) in COMMANDS.items():
+        if name != "fetch":
+            commands.add_parser(name, help=help_text, add_help=False)
+            continue
+        # fetch keeps its own --help (listing the sources); after a source,
+        # --help goes to that source's script like any other option.
+        fetch = commands.add_parser(name, help=help_text, description=help_text)
+        sources = fetch.add_subparsers(dest="source", required=True, metavar="source")
+        for source, (_, source_help) in FETCH_SOURCES.items():
+            sources.add_parser(source, help=source_help, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    if args.command == "fetch":
+        run_script(FETCH_SOURCES[args.source][0], rest)
+    elif args.command == "predict":
+        # predict.py and predict_bias.py share their options apart from --decay-days
+        mode = argparse.ArgumentParser(add_help=False)
+        mode.add_argument("--mode", choices=["base", "bias"], default="base")
+        known, rest = mode.parse_known_args(rest)
+        run_script("predict_bias" if known.mode == "bias" else "predict", rest)
+    else:
+        run_script(COMMANDS[args.command][0], rest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import copy
+import json
+import os
+from datetime import datetime
+
+import pytest
+from db import connect
+from espn import fetch_scoreboards, is_final, parse_scoreboard
+from ingest import ingest_scoreboards
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "espn")
+JULY_15, JULY_16 = datetime(2024, 7, 15), datetime(2024, 7, 16)
+
+
+def load(date):
+    with open(os.path.join(FIXTURES, f"{date:%Y%m%d}.json")) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / "games.db"))
+    yield conn
+    conn.close()
+
+
+def test_completed_game():
+    schedule, results = parse_scoreboard(load(JULY_15))
+    assert results[0] == {"date": "2024-07-15", "home_team": "New York Liberty",
+                          "away_team": "Connecticut Sun", "home_score": 79, "away_score": 71,
+                          "source": "espn"}
+    assert schedule[0]["game_time"] == "2024-07-15T23:30:00+00:00"
+    assert schedule[0]["game_time_local"] == "2024-07-15T18:30:00-05:00"
+
+
+def test_in_progress_game_is_scheduled_but_not_a_result():
+    schedule, results = parse_scoreboard(load(JULY_15))
+    assert ("Chicago Sky", "Indiana Fever") in {(g["home_team"], g["away_team"]) for g in schedule}
+    assert ("Chicago Sky", "Indiana Fever") not in {(g["home_team"], g["away_team"]) for g in results}
+    assert len(schedule) == 3 and len(results) == 2
+
+
+def test_late_tip_off_keeps_its_central_date():
+    schedule, results = parse_scoreboard(load(JULY_15))
+    late = next(g for g in schedule if g["home_team"] == "Las Vegas Aces")
+    assert late["game_time"].startswith("2024-07-16T02:00")
+    assert late["date"] == "2024-07-15"
+    assert late["game_time_local"] == "2024-07-15T21:00:00-05:00"
+    assert next(g for g in results if g["home_team"] == "Las Vegas Aces")["date"] == "2024-07-15"
+
+
+def test_is_final_waits_for_every_game():
+    assert not is_final(JULY_15, load(JULY_15), today=datetime(2024, 7, 20))
+    assert not is_final(JULY_16, load(JULY_16), today=datetime(2024, 7, 20))
+    assert is_final(JULY_15, {"events": load(JULY_15)["events"][::2]}, today=datetime(2024, 7, 20))
+    assert not is_final(JULY_15, {"events": []}, today=datetime(2024, 7, 16))
+
+
+def test_fetch_from_fixture_dir():
+    fetched = fetch_scoreboards([JULY_15, JULY_16, datetime(2024, 7, 17)], fixture_dir=FIXTURES)
+    assert [date for date, _ in fetched] == [JULY_15, JULY_16, datetime(2024, 7, 17)]
+    assert fetched[0][1] == load(JULY_15)
+    assert fetched[2][1] == {"events": []}
+
+
+def test_ingest_dedupes_games_listed_on_two_dates(conn):
+    payloads = [payload for _, payload in fetch_scoreboards([JULY_15, JULY_16], fixture_dir=FIXTURES)]
+    assert ingest_scoreboards(conn, payloads) == (4, 2, 0)
+    assert conn.execute("SELECT COUNT(*) FROM schedule").fetchone()[0] == 4
+    assert conn.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 2
+    assert conn.execute(
+        "SELECT date FROM games WHERE home_team = 'Las Vegas Aces'"
+    ).fetchall() == [("2024-07-15",)]
+
+    # Same payloads again: nothing to write
+    assert ingest_scoreboards(conn, payloads) == (0, 0, 0)
+
+
+def test_ingest_upserts_finished_and_corrected_games(conn):
+    ingest_scoreboards(conn, [load(JULY_15)])
+
+    later = copy.deepcopy(load(JULY_15))
+    in_progress = later["events"][1]["competitions"][0]
+    in_progress["status"]["type"].update(state="post", completed=True)
+    in_progress["competitors"][0]["score"], in_progress["competitors"][1]["score"] = "80", "85"
+    later["events"][0]["competitions"][0]["competitors"][0]["score"] = "81"  # stat correction
+    later["events"][2]["competitions"][0]["date"] = "2024-07-16T02:30Z"     # tip-off moved
+
+    assert ingest_scoreboards(conn, [later]) == (1, 1, 1)
+    assert conn.execute(
+        "SELECT home_team, home_score, away_score FROM games ORDER BY home_team"
+    ).fetchall() == [("Chicago Sky", 80, 85), ("Las Vegas Aces", 88, 84), ("New York Liberty", 81, 71)]
+    assert conn.execute(
+        "SELECT game_time FROM schedule WHERE home_team = 'Las Vegas Aces'"
+    ).fetchone() == ("2024-07-16T02:30:00+00:00",)
@@ -0,0 +1,100 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+from espn import SCOREBOARD_URL, fetch_scoreboard
+from http_cache import ResponseCache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "espn")
+ETAG = '"scoreboard-v1"'
+LAST_MODIFIED = "Tue, 16 Jul 2024 06:00:00 GMT"
+
+
+class RecordedResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class RecordedSession:
+    """Serves the recorded scoreboards with an ETag and answers conditional GETs with 304."""
+
+    def __init__(self, bodies=None):
+        self.bodies = bodies or {}
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        date = url.rsplit("dates=", 1)[1]
+        if headers.get("If-None-Match") == ETAG or headers.get("If-Modified-Since") == LAST_MODIFIED:
+            return RecordedResponse(304)
+        body = self.bodies.get(date)
+        if body is None:
+            with open(os.path.join(FIXTURES, f"{date}.json"), "rb") as f:
+                body = f.read()
+        return RecordedResponse(200, body, {"ETag": ETAG, "Last-Modified": LAST_MODIFIED})
+
+
+class NoNetwork:
+    def get(self, *args, **kwargs):
+        raise AssertionError("offline cache touched the network")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db")) as cache:
+        yield cache
+
+
+def test_open_entry_revalidates_with_304(cache):
+    session = RecordedSession()
+    first = cache.get(session, SCOREBOARD_URL, params={"dates": "20240715"})
+    second = cache.get(session, SCOREBOARD_URL, params={"dates": "20240715"})
+
+    assert not first.from_cache and second.from_cache
+    assert second.status_code == 200 and second.content == first.content
+    assert session.requests[0][1] == {}
+    assert session.requests[1][1] == {"If-None-Match": ETAG, "If-Modified-Since": LAST_MODIFIED}
+
+
+def test_immutable_entry_is_never_refetched(cache):
+    session = RecordedSession()
+    first = cache.get(session, SCOREBOARD_URL, params={"dates": "20240716"}, immutable=lambda resp: True)
+    for _ in range(3):
+        again = cache.get(session, SCOREBOARD_URL, params={"dates": "20240716"}, immutable=lambda resp: True)
+        assert again.from_cache and again.json() == first.json()
+    assert len(session.requests) == 1
+
+
+def test_scoreboard_pinned_once_final(cache):
+    with open(os.path.join(FIXTURES, "20240715.json")) as f:
+        day = json.load(f)
+    finished = {**day, "events": [event for event in day["events"]
+                                  if event["competitions"][0]["status"]["type"]["completed"]]}
+    session = RecordedSession(bodies={"20240715": json.dumps(finished).encode()})
+
+    for _ in range(3):
+        assert fetch_scoreboard(datetime(2024, 7, 15), session, cache=cache) == finished
+    assert len(session.requests) == 1
+
+    # The recorded 07-16 scoreboard has a game still to play, so it stays open
+    for _ in range(2):
+        fetch_scoreboard(datetime(2024, 7, 16), session, cache=cache)
+    assert len(session.requests) == 3
+
+
+def test_offline_replays_hits_and_misses_without_network(tmp_path):
+    path = str(tmp_path / "http.db")
+    with ResponseCache(path) as cache:
+        online = cache.get(RecordedSession(), SCOREBOARD_URL, params={"dates": "20240715"})
+
+    with ResponseCache(path, offline=True) as cache:
+        hit = cache.get(NoNetwork(), SCOREBOARD_URL, params={"dates": "20240715"})
+        miss = cache.get(NoNetwork(), SCOREBOARD_URL, params={"dates": "20240801"})
+        assert fetch_scoreboard(datetime(2024, 8, 1), NoNetwork(), cache=cache) is None
+
+    assert hit.from_cache and hit.content == online.content
+    assert miss.status_code == 504 and not miss.from_cache
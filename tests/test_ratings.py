@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ratings import SRSState, compute_srs
+from synthetic import generate_league
+
+EAST = ["Atlanta Dream", "Chicago Sky", "Connecticut Sun", "Indiana Fever"]
+WEST = ["Las Vegas Aces", "Los Angeles Sparks", "Phoenix Mercury", "Seattle Storm"]
+
+
+def disconnected_season(seed=1, days=12):
+    """Two groups of teams that only play inside their group, one game per pairing a day."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for day in range(days):
+        date = (pd.Timestamp("2024-05-15") + pd.Timedelta(days=day)).strftime("%Y-%m-%d")
+        for group in (EAST, WEST):
+            order = rng.permutation(group)
+            for home, away in zip(order[::2], order[1::2]):
+                rows.append((date, home, away, int(rng.normal(82, 9)), int(rng.normal(79, 9))))
+    return pd.DataFrame(rows, columns=["date", "home_team", "away_team", "home_score", "away_score"])
+
+
+def assert_same_ratings(actual, expected):
+    assert actual.keys() == expected.keys()
+    for team in expected:
+        assert actual[team] == pytest.approx(expected[team], abs=1e-6), team
+
+
+SEASONS = {
+    "connected": generate_league(n_teams=8, n_seasons=1, games_per_team=20, seed=3),
+    "disconnected": disconnected_season(),
+}
+
+
+@pytest.mark.parametrize("season", SEASONS, ids=str)
+def test_vectorized_matches_iterative_on_every_date(season):
+    games = SEASONS[season]
+    for date in sorted(games["date"].unique())[::3]:
+        prefix = games[games["date"] <= date]
+        assert_same_ratings(compute_srs(prefix, method="vectorized"),
+                            compute_srs(prefix, method="iterative"))
+
+
+@pytest.mark.parametrize("season", SEASONS, ids=str)
+def test_incremental_state_matches_iterative(season):
+    games = SEASONS[season]
+    state = SRSState()
+    for date, day in games.groupby("date", sort=True):
+        state.add_games(day)
+        prefix = games[games["date"] <= date]
+        assert_same_ratings(state.ratings(), compute_srs(prefix, method="iterative"))
+
+
+def test_disconnected_groups_centered_together():
+    ratings = compute_srs(disconnected_season(), method="vectorized")
+    assert sum(ratings.values()) == pytest.approx(0.0, abs=1e-9)
+    assert set(ratings) == set(EAST + WEST)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from prediction import WalkForwardFeatures
+from ratings import SRSState
+from ridge import IncrementalRidge, TeamFeatureRidge, fit_ridge
+from synthetic import generate_league
+
+sklearn = pytest.importorskip("sklearn.linear_model")
+
+
+@pytest.mark.parametrize("alpha", [0.1, 1.0, 25.0])
+def test_closed_form_matches_sklearn(alpha):
+    rng = np.random.default_rng(7)
+    X = pd.DataFrame(rng.normal(size=(300, 4)) * [5, 5, 2, 2], columns=list("abcd"))
+    y = X.to_numpy() @ [0.8, -0.7, 1.5, -1.2] + 3.0 + rng.normal(scale=10, size=300)
+
+    model, residual_std = fit_ridge(X, y, solver="closed-form", alpha=alpha)
+    reference = sklearn.Ridge(alpha=alpha).fit(X, y)
+
+    np.testing.assert_allclose(model.coef_, reference.coef_, rtol=0, atol=1e-10)
+    assert model.intercept_ == pytest.approx(reference.intercept_, abs=1e-10)
+    assert residual_std == pytest.approx(fit_ridge(X, y, solver="sklearn", alpha=alpha)[1], abs=1e-10)
+    np.testing.assert_allclose(model.predict(X), reference.predict(X), rtol=0, atol=1e-9)
+
+
+def test_incremental_batches_match_single_fit():
+    rng = np.random.default_rng(11)
+    X, y = rng.normal(size=(200, 3)), rng.normal(size=200)
+    ridge = IncrementalRidge(3)
+    for start in range(0, 200, 37):
+        ridge.add(X[start:start + 37], y[start:start + 37])
+    model, residual_std = ridge.fit()
+    expected, expected_std = fit_ridge(pd.DataFrame(X), y)
+    np.testing.assert_allclose(model.coef_, expected.coef_, atol=1e-12)
+    assert residual_std == pytest.approx(expected_std)
+
+
+def test_team_feature_ridge_matches_training_set_on_every_prefix():
+    games = generate_league(n_teams=10, n_seasons=2, games_per_team=24, seed=5)
+    games["date"] = pd.to_datetime(games["date"])
+    features = WalkForwardFeatures(games)
+    ridge = TeamFeatureRidge(features.n_teams)
+    state = SRSState()
+
+    for date in sorted(games["date"].unique())[10::7]:
+        n_prior = features.count_before(date)
+        state.add_games(features.games.iloc[state.n_games:n_prior])
+        srs = state.ratings_array()
+
+        features.add_to(ridge, ridge.n, n_prior)
+        model, residual_std = ridge.fit(features.srs_values(srs))
+        expected, expected_std = fit_ridge(*features.training_set(n_prior, srs))
+
+        np.testing.assert_allclose(model.coef_, expected.coef_, rtol=0, atol=1e-9)
+        assert model.intercept_ == pytest.approx(expected.intercept_, abs=1e-9)
+        assert residual_std == pytest.approx(expected_std, abs=1e-9)
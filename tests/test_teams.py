@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from teams import FRANCHISES, TeamRegistry
+
+
+def test_aliases_share_an_id():
+    teams = TeamRegistry()
+    ids = teams.ids(["Las Vegas Aces", "LVA", "San Antonio Stars", "Chicago Sky", "chicago sky "])
+    np.testing.assert_array_equal(ids, [5, 5, 5, 1, 1])
+
+
+def test_new_names_get_new_ids():
+    teams = TeamRegistry()
+    ids = teams.ids(["Expansion Team", "Atlanta Dream", "Expansion Team"])
+    np.testing.assert_array_equal(ids, [len(FRANCHISES), 0, len(FRANCHISES)])
+    assert teams.names[-1] == "Expansion Team"
+
+
+@pytest.mark.parametrize("missing", [None, float("nan")])
+def test_missing_name_raises(missing):
+    with pytest.raises(ValueError, match="Missing team name at position 1"):
+        TeamRegistry().ids(["Atlanta Dream", missing, "Chicago Sky"])